@@ -1,7 +1,11 @@
-from pydantic_settings import BaseSettings
+from functools import cached_property
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", frozen=True, extra="ignore")
+
     APP_NAME: str = "finance"
     SECRET_KEY: str = "dev-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
@@ -13,6 +17,14 @@ class Settings(BaseSettings):
     DB_PORT: int = 5432
     DB_USER: str = "postgres"
     DB_PASSWORD: str = "postgres"
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_TIMEOUT: int = 30
+    DB_STATEMENT_CACHE_SIZE: int = 1024
+    DB_TCP_KEEPALIVES_IDLE: int = 30
+
+    CORS_ORIGINS: list[str] = ["*"]
 
     LOG_LEVEL: str = "INFO"
     JSON_LOGS: bool = False
@@ -24,12 +36,20 @@ class Settings(BaseSettings):
     OPENROUTER_HTTP_REFERER: str | None = None
     OPENROUTER_APP_TITLE: str | None = None
     OPENROUTER_TIMEOUT_SECONDS: float = 30.0
+    OPENROUTER_EMBED_MAX_BATCH_ITEMS: int = 96
+    OPENROUTER_EMBED_MAX_BATCH_TOKENS: int = 250_000
+    OPENROUTER_EMBED_CONCURRENCY: int = 4
+    # window for joining concurrent query embeddings into one request; 0 disables
+    OPENROUTER_EMBED_COALESCE_MS: float = 8.0
     OPENROUTER_CHAT_MODEL: str = "qwen/qwen3-235b-a22b-2507"
     OPENROUTER_CHAT_URL: str | None = None
     OPENROUTER_CHAT_TIMEOUT_SECONDS: float = 60.0
     OPENROUTER_CHAT_DEFAULT_TEMPERATURE: float = 0.2
     OPENROUTER_CHAT_DEFAULT_TOP_P: float = 0.9
     OPENROUTER_CHAT_DEFAULT_MAX_TOKENS: int = 1200
+    # explicit cache_control breakpoints are only honoured by Anthropic/Gemini models;
+    # other providers cache the (now stable) system prefix automatically
+    OPENROUTER_CHAT_CACHE_SYSTEM_PROMPT: bool = False
 
     RAG_MESSAGES_LIMIT: int = 20
     RAG_MAX_CONTEXT_CHARS: int = 50_000
@@ -40,6 +60,13 @@ class Settings(BaseSettings):
     RAG_ORCHESTRATOR_CONFIDENCE_THRESHOLD: float = 0.6
     RAG_ORCHESTRATOR_HISTORY_TAIL: int = 5
     RAG_CLARIFICATIONS_LIMIT: int = 3
+    RAG_RESPONSE_CACHE_TTL_SECONDS: int = 300
+    RAG_RESPONSE_CACHE_MAXSIZE: int = 1024
+    # cosine similarity for reusing retrieval results of a paraphrased query;
+    # None disables the semantic cache
+    RAG_SEMANTIC_CACHE_THRESHOLD: float | None = 0.95
+    RAG_SEMANTIC_CACHE_TTL_SECONDS: int = 300
+    RAG_SEMANTIC_CACHE_MAX_ENTRIES: int = 64
 
     RAG_ORCHESTRATOR_TEMPERATURE: float = 0.0
     RAG_ORCHESTRATOR_TOP_P: float = 1.0
@@ -60,6 +87,7 @@ class Settings(BaseSettings):
     RAG_CLARIFICATION_TOP_P: float = 0.9
     RAG_CLARIFICATION_MAX_TOKENS: int = 400
     RAG_TOOL_HISTORY_TAIL: int = 5
+    RAG_TOOL_HISTORY_MAX_TOKENS: int = 4000
 
     RAG_KB_COLLECTION_NAME: str = "knowledge_base_chunks"
     RAG_KB_USER_ID: int = 0
@@ -76,6 +104,19 @@ class Settings(BaseSettings):
     QDRANT_URL: str | None = "http://178.72.149.75:6333"
     QDRANT_COLLECTION_NAME: str = "document_chunks"
     QDRANT_BATCH_SIZE: int = 64
+    QDRANT_PREFER_GRPC: bool = True
+    QDRANT_GRPC_PORT: int = 6334
+    QDRANT_TIMEOUT_SECONDS: int = 30
+    QDRANT_UPSERT_CONCURRENCY: int = 4
+    QDRANT_SCALAR_QUANTIZATION: bool = True
+    QDRANT_QUANTIZATION_QUANTILE: float = 0.99
+    QDRANT_QUANTIZATION_OVERSAMPLING: float = 2.0
+    QDRANT_VECTORS_ON_DISK: bool = True
+    QDRANT_FLOAT16_VECTORS: bool = True
+    # beam width at query time; chat issues single queries, so latency wins over recall
+    QDRANT_HNSW_EF: int | None = 64
+    # None/0 lets the Qdrant server derive the segment count from its own CPU count
+    QDRANT_DEFAULT_SEGMENT_NUMBER: int | None = None
 
     MINIO_ENDPOINT: str | None = "http://178.72.149.75:9000"
     MINIO_ACCESS_KEY: str | None = "minioadmin"
@@ -85,7 +126,7 @@ class Settings(BaseSettings):
     MINIO_PUBLIC_ENDPOINT: str | None = "http://178.72.149.75:9001"
     MINIO_USE_SSL: bool = False
 
-    @property
+    @cached_property
     def db_url(self):
         return f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
 
@@ -1,8 +1,9 @@
+import asyncio
 from typing import Annotated
 
 import structlog
-from sqlalchemy import Integer
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy import Integer, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, mapped_column
 
 from config import settings
@@ -18,17 +19,73 @@ int_pk = Annotated[int, mapped_column(Integer, primary_key=True)]
 
 
 def create_db_engine(db_url, **kwargs):
-    return create_async_engine(url=db_url, **kwargs)
+    return create_async_engine(
+        url=db_url,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_pre_ping=True,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        connect_args={
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            # short OLTP queries never benefit from JIT compilation
+            "server_settings": {
+                "jit": "off",
+                # let the server notice connections dropped by NATs/load balancers
+                "tcp_keepalives_idle": str(settings.DB_TCP_KEEPALIVES_IDLE),
+                "tcp_keepalives_interval": "10",
+                "tcp_keepalives_count": "5",
+            },
+        },
+        **kwargs,
+    )
 
 
 engine = create_db_engine(settings.db_url)
 
-session_factory = async_sessionmaker(bind=engine)
+session_factory = async_sessionmaker(
+    bind=engine, expire_on_commit=False, class_=AsyncSession
+)
+
+
+# create_all only runs for a missing schema and never alters existing tables,
+# so every column or index added to the models after the initial release needs
+# a matching idempotent statement here (each is a no-op once applied)
+_SCHEMA_UPGRADES = (
+    "ALTER TABLE parsed_document ADD COLUMN IF NOT EXISTS content_length integer "
+    "GENERATED ALWAYS AS (length(content)) STORED",
+    "ALTER TABLE document_chunk ADD COLUMN IF NOT EXISTS content_length integer "
+    "GENERATED ALWAYS AS (length(chunk_content)) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_parsed_document_content_length "
+    "ON parsed_document (content_length)",
+    "CREATE INDEX IF NOT EXISTS ix_chunk_length ON document_chunk (content_length)",
+    "CREATE INDEX IF NOT EXISTS ix_message_chat_created_desc "
+    "ON message (chat_id, created_at DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_parsed_document_filename_user "
+    "ON parsed_document (filename, user_id)",
+    "CREATE INDEX IF NOT EXISTS ix_message_documents_ids_gin "
+    "ON message USING gin (documents_ids)",
+    "CREATE INDEX IF NOT EXISTS ix_chat_user_active ON chat (user_id, is_active)",
+)
 
 
 async def create_tables():
+    table_names = list(Base.metadata.tables)
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        existing = await conn.scalar(
+            text(
+                "SELECT count(*) FROM pg_tables "
+                "WHERE schemaname = current_schema() AND tablename = ANY(:names)"
+            ),
+            {"names": table_names},
+        )
+        if existing != len(table_names):
+            # only a partially created schema needs the per-table existence checks
+            await conn.run_sync(Base.metadata.create_all, checkfirst=existing > 0)
+        if existing:
+            for statement in _SCHEMA_UPGRADES:
+                await conn.execute(text(statement))
 
 
 async def drop_tables():
@@ -36,6 +93,16 @@ async def drop_tables():
         await conn.run_sync(Base.metadata.drop_all)
 
 
+async def warm_up_pool() -> None:
+    async def _ping():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    # connections are checked out concurrently so the pool opens all of them
+    await asyncio.gather(*(_ping() for _ in range(settings.DB_POOL_SIZE)))
+    logger.info("Database pool warmed up", pool_size=settings.DB_POOL_SIZE)
+
+
 async def init_db():
     # await drop_tables()
     await create_tables()
@@ -1,7 +1,7 @@
 import enum
 from datetime import datetime
+from functools import cache
 
-from passlib.context import CryptContext
 from sqlalchemy import (
     String,
     TypeDecorator,
@@ -10,16 +10,29 @@ from sqlalchemy import (
     TEXT,
     Index,
     ARRAY,
+    Computed,
+    text,
 )
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import Mapped, mapped_column, synonym, relationship
-from sqlalchemy import func
 
 from db.base import Base, int_pk
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+@cache
+def _get_pwd_context():
+    from passlib.context import CryptContext
+
+    # bcrypt stays verifiable for hashes created before the switch to argon2id
+    return CryptContext(
+        schemes=["argon2", "bcrypt"],
+        deprecated="auto",
+        argon2__type="ID",
+        argon2__time_cost=3,
+        argon2__memory_cost=8192,
+        argon2__parallelism=1,
+    )
 
 
 class IntEnum(TypeDecorator):
@@ -30,10 +43,7 @@ class IntEnum(TypeDecorator):
         self._enumtype = enumtype
 
     def process_bind_param(self, value, dialect):
-        if isinstance(value, int):
-            return value
-
-        return value.value
+        return None if value is None else int(value)
 
     def process_result_value(self, value, dialect):
         return self._enumtype(value)
@@ -72,11 +82,11 @@ class User(Base):
     )
 
     def verify_password(self, plain_password: str) -> bool:
-        return pwd_context.verify(plain_password, self.hashed_password)
+        return _get_pwd_context().verify(plain_password, self.hashed_password)
 
     @staticmethod
     def get_password_hash(password: str) -> str:
-        return pwd_context.hash(password)
+        return _get_pwd_context().hash(password)
 
 
 class Prompt(Base):
@@ -120,6 +130,7 @@ class Chat(Base):
             unique=True,
             postgresql_where=(is_active.is_(True)),
         ),
+        Index("ix_chat_user_active", "user_id", "is_active"),
     )
 
 
@@ -146,12 +157,20 @@ class Message(Base):
         uselist=True,
     )
 
+    __table_args__ = (
+        Index("ix_message_chat_created_desc", "chat_id", text("created_at DESC")),
+        Index("ix_message_documents_ids_gin", "documents_ids", postgresql_using="gin"),
+    )
+
 
 class ParsedDocument(Base):
     __tablename__ = "parsed_document"
 
     document_id: Mapped[int_pk] = mapped_column()
     content: Mapped[str] = mapped_column(TEXT, nullable=False)
+    content_length: Mapped[int] = mapped_column(
+        Integer, Computed("length(content)", persisted=True)
+    )
     minio_url: Mapped[str] = mapped_column(String(200))
     filename: Mapped[str] = mapped_column(String(200))
     user_id: Mapped[int] = mapped_column(
@@ -168,6 +187,11 @@ class ParsedDocument(Base):
         passive_deletes=True,
     )
 
+    __table_args__ = (
+        Index("ix_parsed_document_filename_user", "filename", "user_id"),
+        Index("ix_parsed_document_content_length", "content_length"),
+    )
+
     @hybrid_property
     def is_general(self) -> bool:
         return self.user_id is None
@@ -184,7 +208,7 @@ class ParsedDocument(Base):
     @document_length.inplace.expression
     @classmethod
     def _length(cls):
-        return func.length(cls.content)
+        return cls.content_length
 
 
 class DocumentChunk(Base):
@@ -193,6 +217,9 @@ class DocumentChunk(Base):
     chunk_id: Mapped[int_pk] = mapped_column()
     chunk_content: Mapped[str] = mapped_column(TEXT)
     chunk_serial: Mapped[int] = mapped_column()
+    content_length: Mapped[int] = mapped_column(
+        Integer, Computed("length(chunk_content)", persisted=True)
+    )
     document_id: Mapped[int] = mapped_column(
         ForeignKey("parsed_document.document_id", ondelete="CASCADE")
     )
@@ -202,6 +229,8 @@ class DocumentChunk(Base):
         "ParsedDocument", back_populates="chunks"
     )
 
+    __table_args__ = (Index("ix_chunk_length", "content_length"),)
+
     @hybrid_property
     def chunk_length(self) -> int:
         return len(self.chunk_content) if self.chunk_content else 0
@@ -209,4 +238,4 @@ class DocumentChunk(Base):
     @chunk_length.inplace.expression
     @classmethod
     def chunk_length(cls):
-        return func.length(cls.chunk_content)
+        return cls.content_length
@@ -1,6 +1,6 @@
 from typing import Any, Generic, Sequence, Type, TypeVar
 
-from sqlalchemy import delete, select
+from sqlalchemy import delete, inspect, select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -19,10 +19,7 @@ class BaseRepository(Generic[M]):
         self._db = db
 
     async def get_one_by_id(self, pk: int) -> M | None:
-        result = await self._db.execute(
-            select(self.__model__).filter(self.__model__.id == pk)
-        )
-        return result.scalar_one_or_none()
+        return await self._db.get(self.__model__, pk)
 
     async def get_all(self) -> Sequence[M]:
         result = await self._db.execute(select(self.__model__))
@@ -39,6 +36,8 @@ class BaseRepository(Generic[M]):
         await self._db.flush()
 
     async def save(self, obj: M, **attrs: Any) -> None:
+        if not attrs and inspect(obj).persistent and not self._db.is_modified(obj):
+            return
         self._db.add(obj)
         set_attrs(obj, attrs)
         try:
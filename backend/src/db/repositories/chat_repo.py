@@ -1,9 +1,10 @@
 from typing import Sequence
 
-from sqlalchemy import update, select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import RowMapping, update, select
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
-from db.models import Chat, Prompt, User, Message
+from db.models import Chat, ParsedDocument, Prompt, User
 from db.repositories.base_repo import BaseRepository
 
 
@@ -11,46 +12,78 @@ class ChatRepository(BaseRepository[Chat]):
     __model__ = Chat
 
     async def set_active(self, user: User, chat_id: int) -> None:
+        # uq_one_active_chat_per_user is checked row by row, so the previous
+        # active chat has to be switched off before the target is switched on.
+        await self._deactivate_all(user, keep_chat_id=chat_id)
         await self._db.execute(
-            update(Chat).where(Chat.user == user).values(is_active=False)
+            update(Chat)
+            .where(Chat.chat_id == chat_id, Chat.is_active.is_(False))
+            .values(is_active=True)
         )
-        await self._db.execute(
-            update(Chat).where(Chat.chat_id == chat_id).values(is_active=True)
+
+    async def load_with_prompt(self, chat_id: int, user_id: int) -> Chat | None:
+        return await self._db.scalar(
+            select(Chat)
+            .options(joinedload(Chat.prompt))
+            .where(Chat.chat_id == chat_id, Chat.user_id == user_id)
         )
 
     async def create_new_chat(self, prompt: Prompt, user: User) -> Chat:
         chat = Chat(prompt_id=prompt.prompt_id, user=user)
-        await self.set_active(chat_id=chat.id, user=user)
+        await self._deactivate_all(user)
         await self.create(chat)
+        return await self.get_chat_with_documents(chat.id)
 
-        stmt = (
-            select(Chat)
-            .options(
-                selectinload(Chat.messages).selectinload(Message.attached_documents)
-            )
-            .options(selectinload(Chat.prompt))
-            .where(Chat.id == chat.id)
+    async def _deactivate_all(
+        self, user: User, keep_chat_id: int | None = None
+    ) -> None:
+        stmt = update(Chat).where(
+            Chat.user_id == user.user_id, Chat.is_active.is_(True)
         )
-        result = await self._db.execute(stmt)
-        return result.scalar_one()
+        if keep_chat_id is not None:
+            stmt = stmt.where(Chat.chat_id != keep_chat_id)
+        await self._db.execute(stmt.values(is_active=False))
 
-    async def get_all_for_user(self, user: User) -> Sequence[Chat]:
-        stmt = select(Chat).where(
-            Chat.user == user,
+    async def get_all_for_user_summary(self, user: User) -> Sequence[RowMapping]:
+        stmt = select(Chat.chat_id, Chat.is_active, Chat.created_at).where(
+            Chat.user_id == user.user_id
         )
         result = await self._db.execute(stmt)
-        return result.scalars().all()
+        return result.mappings().all()
 
     async def get_one_by_id(self, pk: int) -> Chat | None:
-        from sqlalchemy.orm import selectinload
+        return await self.get_chat_with_documents(pk)
 
+    async def get_chat_with_documents(self, pk: int) -> Chat | None:
         stmt = (
             select(Chat)
             .where(Chat.id == pk)
-            .options(
-                selectinload(Chat.messages).selectinload(Message.attached_documents),
-                selectinload(Chat.prompt),
-            )
+            .options(selectinload(Chat.messages), selectinload(Chat.prompt))
         )
         result = await self._db.execute(stmt)
-        return result.scalar_one_or_none()
+        chat = result.scalar_one_or_none()
+        if chat is None:
+            return None
+
+        document_ids = {
+            doc_id for msg in chat.messages for doc_id in (msg.documents_ids or [])
+        }
+        docs_by_id: dict[int, ParsedDocument] = {}
+        if document_ids:
+            docs = await self._db.scalars(
+                select(ParsedDocument).where(
+                    ParsedDocument.document_id.in_(document_ids)
+                )
+            )
+            docs_by_id = {doc.document_id: doc for doc in docs}
+        for msg in chat.messages:
+            set_committed_value(
+                msg,
+                "attached_documents",
+                [
+                    docs_by_id[doc_id]
+                    for doc_id in (msg.documents_ids or [])
+                    if doc_id in docs_by_id
+                ],
+            )
+        return chat
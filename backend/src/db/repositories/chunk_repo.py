@@ -1,14 +1,27 @@
 from typing import Sequence
 
-from sqlalchemy import select
+from sqlalchemy import bindparam, select
 
 from db.models import DocumentChunk
 from db.repositories.base_repo import BaseRepository
 
 
+_SELECT_BY_IDS = select(DocumentChunk).where(
+    DocumentChunk.chunk_id.in_(bindparam("chunk_ids", expanding=True))
+)
+
+
 class DocumentChunkRepository(BaseRepository[DocumentChunk]):
     __model__ = DocumentChunk
 
+    async def create_many(
+        self, chunks: Sequence[DocumentChunk]
+    ) -> Sequence[DocumentChunk]:
+        # a single flush lets SQLAlchemy batch the rows into one INSERT ... RETURNING
+        self._db.add_all(chunks)
+        await self._db.flush()
+        return chunks
+
     async def get_all_by_document_id(self, document_id: int) -> Sequence[DocumentChunk]:
         stmt = (
             select(DocumentChunk)
@@ -24,6 +37,5 @@ class DocumentChunkRepository(BaseRepository[DocumentChunk]):
         if not chunk_ids:
             return []
 
-        stmt = select(DocumentChunk).where(DocumentChunk.chunk_id.in_(chunk_ids))
-        result = await self._db.execute(stmt)
+        result = await self._db.execute(_SELECT_BY_IDS, {"chunk_ids": list(chunk_ids)})
         return result.scalars().all()
@@ -1,6 +1,6 @@
 from typing import Sequence
 
-from sqlalchemy import select, or_, exists
+from sqlalchemy import Integer, RowMapping, cast, func, select, or_
 from sqlalchemy.orm import selectinload
 
 from db.models import ParsedDocument, User
@@ -10,12 +10,16 @@ from db.repositories.base_repo import BaseRepository
 class ParsedDocumentRepository(BaseRepository[ParsedDocument]):
     __model__ = ParsedDocument
 
-    async def get_all_for_user(self, user: User) -> Sequence[ParsedDocument]:
-        stmt = select(ParsedDocument).where(
-            or_(ParsedDocument.user_id == user.id, ParsedDocument.is_general)
-        )
+    async def get_all_for_user_summary(self, user: User) -> Sequence[RowMapping]:
+        stmt = select(
+            ParsedDocument.document_id,
+            ParsedDocument.minio_url,
+            ParsedDocument.filename,
+            ParsedDocument.created_at,
+            ParsedDocument.is_general.label("is_general"),
+        ).where(or_(ParsedDocument.user_id == user.user_id, ParsedDocument.is_general))
         result = await self._db.execute(stmt)
-        return result.scalars().all()
+        return result.mappings().all()
 
     async def get_one_with_chunks_by_id(self, document_id: int) -> ParsedDocument:
         stmt = (
@@ -37,12 +41,75 @@ class ParsedDocumentRepository(BaseRepository[ParsedDocument]):
         result = await self._db.execute(stmt)
         return result.scalars().all()
 
+    async def get_total_content_length(self, document_ids: Sequence[int]) -> int:
+        """Sum of the stored content lengths; no document body is read."""
+        if not document_ids:
+            return 0
+        stmt = select(func.coalesce(func.sum(ParsedDocument.content_length), 0)).where(
+            ParsedDocument.document_id.in_(document_ids)
+        )
+        return int(await self._db.scalar(stmt) or 0)
+
+    async def get_content_prefixes(
+        self, document_ids: Sequence[int], budget: int
+    ) -> tuple[Sequence[RowMapping], int]:
+        """Documents in id order, their contents trimmed to share ``budget`` chars.
+
+        Trimming happens in Postgres, so only the prefixes are transferred.
+        Returns the rows (documents past the budget are omitted) and the total
+        untrimmed content length.
+        """
+        if not document_ids:
+            return [], 0
+        length = ParsedDocument.content_length
+        sized = (
+            select(
+                ParsedDocument.document_id,
+                ParsedDocument.filename,
+                ParsedDocument.minio_url,
+                ParsedDocument.created_at,
+                ParsedDocument.content,
+                func.coalesce(
+                    func.sum(length).over(
+                        order_by=ParsedDocument.document_id, rows=(None, -1)
+                    ),
+                    0,
+                ).label("chars_before"),
+                func.sum(length).over().label("total_length"),
+            )
+            .where(ParsedDocument.document_id.in_(document_ids))
+            .subquery()
+        )
+        stmt = (
+            select(
+                sized.c.document_id,
+                sized.c.filename,
+                sized.c.minio_url,
+                sized.c.created_at,
+                func.substr(
+                    func.coalesce(sized.c.content, ""),
+                    1,
+                    # sum() yields bigint and Postgres has no substr(text, int, bigint)
+                    cast(budget - sized.c.chars_before, Integer),
+                ).label("content"),
+                sized.c.total_length,
+            )
+            .where(sized.c.chars_before < budget)
+            .order_by(sized.c.document_id)
+        )
+        rows = (await self._db.execute(stmt)).mappings().all()
+        if not rows:
+            return [], await self.get_total_content_length(document_ids)
+        return rows, int(rows[0]["total_length"])
+
     async def check_document_exists(self, document_name: str, user: User) -> bool:
-        stmt = select(
-            exists().where(
+        stmt = (
+            select(ParsedDocument.document_id)
+            .where(
                 ParsedDocument.filename == document_name,
                 or_(ParsedDocument.user_id == user.user_id, ParsedDocument.is_general),
             )
+            .limit(1)
         )
         result = await self._db.execute(stmt)
-        return result.scalar()
+        return result.scalar() is not None
@@ -1,23 +1,39 @@
 from typing import Sequence
 
-from sqlalchemy import select
+from sqlalchemy import Row, select, text
 
-from db.models import Message
+from db.models import Message, MessageType
 from db.repositories.base_repo import BaseRepository
 
 
+_NEXT_MESSAGE_ID = text(
+    "SELECT nextval(pg_get_serial_sequence('message', 'message_id'))"
+)
+
+
 class MessageRepository(BaseRepository[Message]):
     __model__ = Message
 
+    async def reserve_id(self) -> int:
+        """Allocate a message_id up front for a message that is inserted later."""
+        return await self._db.scalar(_NEXT_MESSAGE_ID)
+
     async def get_last_for_chat(
         self, *, chat_id: int, limit: int = 20
-    ) -> Sequence[Message]:
-        stmt = (
-            select(Message)
+    ) -> Sequence[Row[tuple[MessageType, str]]]:
+        """Return ``(message_type, content)`` of the last messages, oldest first.
+
+        Only the two columns the chat history needs are fetched, as plain rows.
+        """
+        latest = (
+            select(Message.message_type, Message.content, Message.created_at)
             .where(Message.chat_id == chat_id)
             .order_by(Message.created_at.desc())
             .limit(limit)
+            .subquery()
+        )
+        stmt = select(latest.c.message_type, latest.c.content).order_by(
+            latest.c.created_at
         )
         result = await self._db.execute(stmt)
-        messages = result.scalars().all()
-        return list(reversed(messages))
+        return result.all()
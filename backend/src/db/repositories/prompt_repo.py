@@ -1,15 +1,17 @@
-from sqlalchemy import select
+from sqlalchemy import bindparam, select
 
 from db.models import Prompt
 from db.repositories.base_repo import BaseRepository
 
 
+_SELECT_BY_TITLE = select(Prompt).where(Prompt.title == bindparam("title"))
+
+
 class PromptRepository(BaseRepository[Prompt]):
     __model__ = Prompt
 
     async def get_by_title(self, title: str) -> Prompt | None:
-        stmt = select(Prompt).where(Prompt.title == title)
-        result = await self._db.execute(stmt)
+        result = await self._db.execute(_SELECT_BY_TITLE, {"title": title})
         return result.scalar_one_or_none()
 
     async def upsert_prompt(
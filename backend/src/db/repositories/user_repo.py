@@ -1,5 +1,5 @@
 import structlog
-from sqlalchemy import select
+from sqlalchemy import bindparam, select
 
 from db.base import session_factory
 from db.models import User, Role
@@ -13,15 +13,18 @@ BASE_ADMIN_USERNAME = "admin"
 BASE_ADMIN_EMAIL = "test"
 BASE_ADMIN_PASSWORD = "test"
 
+_SELECT_BY_EMAIL = select(User).where(User.email == bindparam("email"))
+_SELECT_BY_USERNAME = select(User).where(User.username == bindparam("username"))
+
 
 class UserRepository(BaseRepository[User]):
     __model__ = User
 
     async def get_by_email(self, email: str) -> User | None:
-        return await self._db.scalar(select(User).filter(User.email == email))
+        return await self._db.scalar(_SELECT_BY_EMAIL, {"email": email})
 
     async def get_by_username(self, username: str) -> User | None:
-        return await self._db.scalar(select(User).filter(User.username == username))
+        return await self._db.scalar(_SELECT_BY_USERNAME, {"username": username})
 
     async def create_base_admin(
         self, username: str, email: str, password: str
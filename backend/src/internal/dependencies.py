@@ -1,3 +1,4 @@
+from functools import lru_cache
 from typing import Annotated, AsyncGenerator
 
 from fastapi import Depends, HTTPException
@@ -7,8 +8,13 @@ from starlette import status
 
 from db.base import session_factory
 from db.models import Role, User
+from db.repositories.chat_repo import ChatRepository
+from db.repositories.document_repo import ParsedDocumentRepository
+from db.repositories.message_repo import MessageRepository
+from db.repositories.prompt_repo import PromptRepository
 from db.repositories.user_repo import UserRepository
 from internal.security import verify_token
+from services.rag import RagAgent
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
@@ -26,16 +32,50 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
 Db = Annotated[AsyncSession, Depends(get_db)]
 
 
+def get_user_repo(db: Db) -> UserRepository:
+    return UserRepository(db)
+
+
+def get_chat_repo(db: Db) -> ChatRepository:
+    return ChatRepository(db)
+
+
+def get_message_repo(db: Db) -> MessageRepository:
+    return MessageRepository(db)
+
+
+def get_prompt_repo(db: Db) -> PromptRepository:
+    return PromptRepository(db)
+
+
+def get_document_repo(db: Db) -> ParsedDocumentRepository:
+    return ParsedDocumentRepository(db)
+
+
+@lru_cache(maxsize=1)
+def get_agent() -> RagAgent:
+    return RagAgent()
+
+
+Agent = Annotated[RagAgent, Depends(get_agent)]
+
+
+UserRepo = Annotated[UserRepository, Depends(get_user_repo)]
+ChatRepo = Annotated[ChatRepository, Depends(get_chat_repo)]
+MessageRepo = Annotated[MessageRepository, Depends(get_message_repo)]
+PromptRepo = Annotated[PromptRepository, Depends(get_prompt_repo)]
+DocumentRepo = Annotated[ParsedDocumentRepository, Depends(get_document_repo)]
+
+
 security = HTTPBearer()
 
 
 async def get_current_user(
-    db: Db,
+    user_repo: UserRepo,
     credentials: HTTPAuthorizationCredentials = Depends(security),
 ) -> User:
     token = credentials.credentials
     email = verify_token(token)
-    user_repo = UserRepository(db)
 
     if email is None:
         raise HTTPException(
@@ -20,6 +20,8 @@ from db.models import (
     Prompt,
 )
 from db.repositories.user_repo import UserRepository
+from internal.security import verify_password_async
+from services.rag.semantic_cache import invalidate_user_retrieval_cache
 
 logger = structlog.get_logger(__name__)
 
@@ -45,7 +47,11 @@ class AdminAuth(AuthenticationBackend):
                 user_repo = UserRepository(db)
                 user = await user_repo.get_by_username(username)
 
-                if user and user.verify_password(password) and user.role == Role.ADMIN:
+                if (
+                    user
+                    and user.role == Role.ADMIN
+                    and await verify_password_async(user, password)
+                ):
                     request.session.update(
                         {
                             "user_id": str(user.user_id),
@@ -101,6 +107,10 @@ class UserAdmin(ModelView, model=User):
         }
     }
 
+    async def after_model_delete(self, model: User, request: Request) -> None:
+        # the user's documents are removed by the cascade
+        invalidate_user_retrieval_cache(model.user_id)
+
 
 class PromptAdmin(ModelView, model=Prompt):
     can_create = True
@@ -8,7 +8,11 @@ from db.models import User
 from db.repositories.user_repo import UserRepository
 from internal.dependencies import CtxUser, Db
 from internal.schemas.auth import Token, UserCreate, UserLogin, UserResponse
-from internal.security import create_access_token
+from internal.security import (
+    create_access_token,
+    hash_password_async,
+    verify_password_async,
+)
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -16,7 +20,7 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 @router.post("/register", response_model=UserResponse)
 async def register_user(user_data: UserCreate, db: Db) -> UserResponse:
     user_repo = UserRepository(db)
-    hashed_password = User.get_password_hash(user_data.password)
+    hashed_password = await hash_password_async(user_data.password)
     new_user = User(
         username=user_data.username,
         email=user_data.email,
@@ -39,7 +43,7 @@ async def login_user(user_data: UserLogin, db: Db) -> Token:
     user_repo = UserRepository(db)
     user = await user_repo.get_by_email(user_data.email)
 
-    if not user or not user.verify_password(user_data.password):
+    if not user or not await verify_password_async(user, user_data.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
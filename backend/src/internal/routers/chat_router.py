@@ -1,11 +1,23 @@
-from fastapi import APIRouter, HTTPException
+from datetime import datetime
+from typing import AsyncIterator
+
+import orjson
+import structlog
+from fastapi import APIRouter, BackgroundTasks, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
 from starlette import status
 
+from db.base import session_factory
 from db.models import Message, MessageType
-from db.repositories.chat_repo import ChatRepository
-from db.repositories.message_repo import MessageRepository
-from db.repositories.prompt_repo import PromptRepository
-from internal.dependencies import CtxUser, Db
+from internal.dependencies import (
+    Agent,
+    ChatRepo,
+    CtxUser,
+    Db,
+    MessageRepo,
+    PromptRepo,
+)
 from internal.schemas.chat import (
     ChatResponse,
     ExpandedChatResponse,
@@ -13,21 +25,25 @@ from internal.schemas.chat import (
     PromptID,
     MessageResponse,
 )
-from services.rag import RagAgent
+from services.rag.agent import STREAM_RESET, AgentResult
+
+logger = structlog.get_logger(__name__)
 
 router = APIRouter(prefix="/chat", tags=["chat"])
-agent = RagAgent()
+_CHATS_ADAPTER = TypeAdapter(list[ChatResponse])
 
 
 @router.get("", response_model=list[ChatResponse])
-async def get_all_chats(db: Db, user: CtxUser) -> list[ChatResponse]:
-    chats = await ChatRepository(db).get_all_for_user(user)
-    return [ChatResponse.model_validate(chat) for chat in chats]
+async def get_all_chats(chat_repo: ChatRepo, user: CtxUser) -> list[ChatResponse]:
+    chats = await chat_repo.get_all_for_user_summary(user)
+    return _CHATS_ADAPTER.validate_python(chats)
 
 
 @router.get("/{chat_id}", response_model=ExpandedChatResponse)
-async def get_chat(db: Db, user: CtxUser, chat_id: int) -> ExpandedChatResponse:
-    if (chat := await ChatRepository(db).get_one_by_id(chat_id)) and chat.user == user:
+async def get_chat(
+    chat_repo: ChatRepo, user: CtxUser, chat_id: int
+) -> ExpandedChatResponse:
+    if (chat := await chat_repo.get_one_by_id(chat_id)) and chat.user == user:
         return ExpandedChatResponse.from_chat(chat)
     raise HTTPException(status_code=404, detail="Chat not found")
 
@@ -36,17 +52,18 @@ async def get_chat(db: Db, user: CtxUser, chat_id: int) -> ExpandedChatResponse:
     "", response_model=ExpandedChatResponse, status_code=status.HTTP_201_CREATED
 )
 async def create_chat(
-    db: Db, user: CtxUser, prompt_request: PromptID
+    chat_repo: ChatRepo,
+    prompt_repo: PromptRepo,
+    user: CtxUser,
+    prompt_request: PromptID,
 ) -> ExpandedChatResponse:
-    if not (
-        prompt := await PromptRepository(db).get_one_by_id(prompt_request.prompt_id)
-    ):
+    if not (prompt := await prompt_repo.get_one_by_id(prompt_request.prompt_id)):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Prompt not found"
         )
 
     try:
-        chat = await ChatRepository(db).create_new_chat(prompt, user)
+        chat = await chat_repo.create_new_chat(prompt, user)
         return ExpandedChatResponse.from_chat(chat)
 
     except Exception as e:
@@ -54,9 +71,7 @@ async def create_chat(
 
 
 @router.delete("/{chat_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_chat(db: Db, user: CtxUser, chat_id: int) -> None:
-    chat_repo = ChatRepository(db)
-
+async def delete_chat(chat_repo: ChatRepo, user: CtxUser, chat_id: int) -> None:
     if (
         not (chat := await chat_repo.get_one_by_id(chat_id))
         or chat.user_id != user.user_id
@@ -69,27 +84,18 @@ async def delete_chat(db: Db, user: CtxUser, chat_id: int) -> None:
 
 @router.post("/{chat_id}/message", response_model=MessageResponse)
 async def create_message(
-    db: Db, user: CtxUser, chat_id: int, message_data: BaseMessage
+    db: Db,
+    agent: Agent,
+    chat_repo: ChatRepo,
+    message_repo: MessageRepo,
+    user: CtxUser,
+    chat_id: int,
+    message_data: BaseMessage,
+    background_tasks: BackgroundTasks,
 ) -> MessageResponse:
-    chat_repo = ChatRepository(db)
-
-    if (
-        not (chat := await chat_repo.get_one_by_id(chat_id))
-        or chat.user_id != user.user_id
-    ):
-        raise HTTPException(status_code=404, detail="Chat not found")
-
-    await chat_repo.set_active(chat_id=chat_id, user=user)
-    prompt_text = chat.prompt.text if getattr(chat, "prompt", None) else None
-
-    message_repo = MessageRepository(db)
-    user_message = Message(
-        content=message_data.content,
-        message_type=MessageType.USER,
-        chat_id=chat_id,
-        documents_ids=message_data.documents_ids,
+    user_message, ai_message_id, prompt_text = await _store_user_message(
+        db, chat_repo, message_repo, user, chat_id, message_data
     )
-    await message_repo.create(user_message)
 
     result = await agent.run(
         db=db,
@@ -100,12 +106,117 @@ async def create_message(
         answer_instructions=prompt_text,
     )
 
-    ai_message = Message(
-        content=result.answer,
-        message_type=MessageType.MODEL,
+    ai_message = _build_ai_message(ai_message_id, result.answer, user_message)
+    background_tasks.add_task(_persist_message, ai_message)
+
+    return MessageResponse.model_validate(ai_message)
+
+
+@router.post("/{chat_id}/message/stream")
+async def create_message_stream(
+    db: Db,
+    agent: Agent,
+    chat_repo: ChatRepo,
+    message_repo: MessageRepo,
+    user: CtxUser,
+    chat_id: int,
+    message_data: BaseMessage,
+    background_tasks: BackgroundTasks,
+) -> StreamingResponse:
+    """Server-sent events: ``delta`` events carry answer text as it is generated,
+    a ``reset`` event tells the client to discard the deltas received so far
+    (the model moved from a preamble to tool calls), and a final ``message``
+    event carries the stored reply (same shape as the non-streaming endpoint)."""
+    user_message, ai_message_id, prompt_text = await _store_user_message(
+        db, chat_repo, message_repo, user, chat_id, message_data
+    )
+
+    async def events() -> AsyncIterator[bytes]:
+        try:
+            async for item in agent.run_stream(
+                db=db,
+                user=user,
+                query=user_message.content,
+                chat_id=chat_id,
+                selected_document_ids=user_message.documents_ids or [],
+                answer_instructions=prompt_text,
+            ):
+                if isinstance(item, AgentResult):
+                    result = item
+                elif item is STREAM_RESET:
+                    yield _sse("reset", {})
+                else:
+                    yield _sse("delta", {"content": item})
+        except Exception:
+            logger.error("message-stream-failed", chat_id=chat_id, exc_info=True)
+            yield _sse("error", {"message": "An unexpected error occurred"})
+            return
+
+        ai_message = _build_ai_message(ai_message_id, result.answer, user_message)
+        # background tasks run once the stream has been fully sent
+        background_tasks.add_task(_persist_message, ai_message)
+        yield _sse(
+            "message",
+            MessageResponse.model_validate(ai_message).model_dump(mode="json"),
+        )
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+async def _store_user_message(
+    db: Db,
+    chat_repo: ChatRepo,
+    message_repo: MessageRepo,
+    user: CtxUser,
+    chat_id: int,
+    message_data: BaseMessage,
+) -> tuple[Message, int, str | None]:
+    if not (chat := await chat_repo.load_with_prompt(chat_id, user.user_id)):
+        raise HTTPException(status_code=404, detail="Chat not found")
+
+    if not chat.is_active:
+        await chat_repo.set_active(chat_id=chat_id, user=user)
+    prompt_text = chat.prompt.text if chat.prompt else None
+
+    user_message = Message(
+        content=message_data.content,
+        message_type=MessageType.USER,
         chat_id=chat_id,
+        documents_ids=message_data.documents_ids,
+    )
+    await message_repo.create(user_message)
+    ai_message_id = await message_repo.reserve_id()
+    # commit before the LLM call so the chat row lock and the pooled connection
+    # are not held for the whole agent run; the AI reply is stored after the
+    # response is sent, under the id reserved here
+    await db.commit()
+    return user_message, ai_message_id, prompt_text
+
+
+def _build_ai_message(message_id: int, answer: str, user_message: Message) -> Message:
+    return Message(
+        message_id=message_id,
+        content=answer,
+        message_type=MessageType.MODEL,
+        chat_id=user_message.chat_id,
+        created_at=datetime.now(),
         documents_ids=user_message.documents_ids,
     )
-    await message_repo.create(ai_message)
 
-    return MessageResponse.model_validate(ai_message)
+
+def _sse(event: str, data: dict) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+async def _persist_message(message: Message) -> None:
+    try:
+        async with session_factory() as db:
+            db.add(message)
+            await db.commit()
+    except Exception:
+        logger.error(
+            "message-persist-failed",
+            message_id=message.message_id,
+            chat_id=message.chat_id,
+            exc_info=True,
+        )
@@ -1,31 +1,32 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File
+from pydantic import TypeAdapter
 from starlette.status import HTTP_404_NOT_FOUND, HTTP_400_BAD_REQUEST, HTTP_409_CONFLICT
 
 from db.models import ParsedDocument
-from db.repositories.document_repo import ParsedDocumentRepository
-from internal.dependencies import Db, CtxUser
+from internal.dependencies import Db, CtxUser, DocumentRepo
 from internal.schemas.documents import DocumentResponse, ExpandedDocumentResponse
 from services.document_processing.pipeline import DocumentExistsError
 from services.document_service import process_document
+from services.rag.semantic_cache import invalidate_user_retrieval_cache
 
 
 router = APIRouter(prefix="/document", tags=["document"])
+_DOCS_ADAPTER = TypeAdapter(list[DocumentResponse])
 
 
 @router.get("", response_model=list[DocumentResponse])
-async def get_documents_for_user(db: Db, user: CtxUser) -> list[DocumentResponse]:
-    docs = await ParsedDocumentRepository(db).get_all_for_user(user)
-    return [DocumentResponse.model_validate(doc) for doc in docs]
+async def get_documents_for_user(
+    doc_repo: DocumentRepo, user: CtxUser
+) -> list[DocumentResponse]:
+    docs = await doc_repo.get_all_for_user_summary(user)
+    return _DOCS_ADAPTER.validate_python(docs)
 
 
 @router.get("/{document_id}", response_model=ExpandedDocumentResponse)
 async def get_document(
-    db: Db, user: CtxUser, document_id: int
+    doc_repo: DocumentRepo, user: CtxUser, document_id: int
 ) -> ExpandedDocumentResponse:
-    if (
-        not (doc := await ParsedDocumentRepository(db).get_one_by_id(document_id))
-        or doc.user != user
-    ):
+    if not (doc := await doc_repo.get_one_by_id(document_id)) or doc.user != user:
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Document not found")
 
     return ExpandedDocumentResponse.model_validate(doc)
@@ -52,8 +53,9 @@ async def upload_document(
 
 
 @router.delete("/{document_id}", status_code=204)
-async def delete_document(db: Db, user: CtxUser, document_id: int) -> None:
-    repo = ParsedDocumentRepository(db)
+async def delete_document(
+    db: Db, repo: DocumentRepo, user: CtxUser, document_id: int
+) -> None:
     doc = await repo.get_one_by_id(document_id)
 
     if not doc:
@@ -63,3 +65,6 @@ async def delete_document(db: Db, user: CtxUser, document_id: int) -> None:
         raise HTTPException(status_code=403, detail="Not enough permissions")
 
     await repo.delete(ParsedDocument.document_id == document_id)
+    # commit first so a concurrent search cannot re-cache the deleted document
+    await db.commit()
+    invalidate_user_retrieval_cache(user.user_id)
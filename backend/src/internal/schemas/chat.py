@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, TypeAdapter
 
 from db.models import MessageType
 
@@ -13,8 +13,7 @@ class BaseMessage(BaseModel):
     content: str
     documents_ids: list[int] = []
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class MessageResponse(BaseMessage):
@@ -31,8 +30,7 @@ class ChatResponse(BaseModel):
     is_active: bool
     created_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class ExpandedChatResponse(ChatResponse):
@@ -41,15 +39,11 @@ class ExpandedChatResponse(ChatResponse):
 
     @classmethod
     def from_chat(cls, chat) -> "ExpandedChatResponse":
-        prompt_text = (
-            chat.prompt.text if hasattr(chat.prompt, "text") else chat.prompt.title
+        prompt_text = getattr(chat.prompt, "text", None) or chat.prompt.title
+        messages = _MESSAGES_ADAPTER.validate_python(
+            getattr(chat, "messages", None) or [], from_attributes=True
         )
 
-        messages = []
-        if hasattr(chat, "messages") and chat.messages:
-            for msg in chat.messages:
-                messages.append(MessageResponse.model_validate(msg))
-
         return cls(
             chat_id=chat.id,
             is_active=chat.is_active,
@@ -57,3 +51,6 @@ class ExpandedChatResponse(ChatResponse):
             prompt=prompt_text,
             messages=messages,
         )
+
+
+_MESSAGES_ADAPTER = TypeAdapter(list[MessageResponse])
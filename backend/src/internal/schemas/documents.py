@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 
 class DocumentResponse(BaseModel):
@@ -10,8 +10,7 @@ class DocumentResponse(BaseModel):
     created_at: datetime
     is_general: bool
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class ExpandedDocumentResponse(DocumentResponse):
@@ -1,30 +1,58 @@
-from datetime import datetime, timedelta
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import timedelta
 
 from jose import jwt, JWTError
 
 from config import settings
+from db.models import User
+
+
+_TOKEN_CACHE_MAXSIZE = 8192
+# token -> (email, exp timestamp) for tokens that already passed verification
+_TOKEN_CACHE: OrderedDict[str, tuple[str, float]] = OrderedDict()
 
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
     to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.now() + expires_delta
-    else:
-        expire = datetime.now() + timedelta(hours=settings.ACCESS_TOKEN_EXPIRE_HOURS)
+    if expires_delta is None:
+        expires_delta = timedelta(hours=settings.ACCESS_TOKEN_EXPIRE_HOURS)
 
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": int(time.time() + expires_delta.total_seconds())})
     encoded_jwt = jwt.encode(
         to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
     )
     return encoded_jwt
 
 
+async def hash_password_async(password: str) -> str:
+    return await asyncio.to_thread(User.get_password_hash, password)
+
+
+async def verify_password_async(user: User, password: str) -> bool:
+    return await asyncio.to_thread(user.verify_password, password)
+
+
 def verify_token(token: str) -> str | None:
+    if (cached := _TOKEN_CACHE.get(token)) is not None:
+        email, expires_at = cached
+        if expires_at > time.time():
+            _TOKEN_CACHE.move_to_end(token)
+            return email
+        _TOKEN_CACHE.pop(token, None)
+
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
         )
-        email: str = payload.get("sub")
-        return None if email is None else email
     except JWTError:
         return None
+
+    email: str | None = payload.get("sub")
+    expires_at = payload.get("exp")
+    if email is not None and isinstance(expires_at, (int, float)):
+        _TOKEN_CACHE[token] = (email, float(expires_at))
+        if len(_TOKEN_CACHE) > _TOKEN_CACHE_MAXSIZE:
+            _TOKEN_CACHE.popitem(last=False)
+    return email
@@ -3,18 +3,22 @@ from typing import Any, AsyncGenerator
 
 import structlog
 from fastapi import APIRouter, FastAPI
+from fastapi.responses import ORJSONResponse
 from sqlalchemy import text
 from starlette.middleware.cors import CORSMiddleware
 from starlette.requests import Request
-from starlette.responses import JSONResponse
 
 from config import settings
-from db.base import init_db, engine, session_factory
+from db.base import init_db, engine, session_factory, warm_up_pool
 from db.repositories.user_repo import create_default_admin
-from internal.dependencies import Db
+from internal.dependencies import Db, get_agent
 from internal.routers import auth_router, chat_router, document_router
 from internal.routers.admin import setup_admin
+from internal.schemas.auth import Token, UserResponse
+from internal.schemas.chat import ChatResponse, ExpandedChatResponse, MessageResponse
+from internal.schemas.documents import DocumentResponse, ExpandedDocumentResponse
 from setup_logger import setup_logging
+from services.embeddings import close_http_client
 from services.rag.prompt_registry import seed_prompts
 
 setup_logging(log_level=settings.LOG_LEVEL)
@@ -29,6 +33,7 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, Any]:
         logger.info("Initializing database connection")
         await init_db()
         logger.info("Database initialized successfully")
+        await warm_up_pool()
         if settings.ADD_BASE_ADMIN:
             await create_default_admin()
 
@@ -36,6 +41,9 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, Any]:
             await seed_prompts(session)
             await session.commit()
 
+        get_agent()
+        logger.info("RAG agent initialized")
+
         yield
 
     except Exception:
@@ -44,16 +52,18 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, Any]:
 
     finally:
         logger.info("Application shutting down")
+        await close_http_client()
 
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
+    allow_origins=settings.CORS_ORIGINS,
+    # credentials are only valid with explicit origins; the API uses bearer tokens
+    allow_credentials="*" not in settings.CORS_ORIGINS,
+    allow_methods=["GET", "POST", "DELETE"],
     allow_headers=["*"],
 )
 
@@ -67,20 +77,32 @@ api_router.include_router(document_router.router)
 app.include_router(api_router)
 admin = setup_admin(app, engine)
 
+# build response validators/serializers at import time, not on the first request
+for schema in (
+    UserResponse,
+    Token,
+    ChatResponse,
+    MessageResponse,
+    ExpandedChatResponse,
+    DocumentResponse,
+    ExpandedDocumentResponse,
+):
+    schema.model_rebuild(force=True)
+
 
 @app.get("/health", include_in_schema=False)
-async def health_check(db: Db) -> JSONResponse:
+async def health_check(db: Db) -> ORJSONResponse:
     try:
         logger.info("health-check", endpoint="/health")
         await db.execute(text("SELECT 1"))
-        return JSONResponse({"status": "healthy"}, status_code=200)
+        return ORJSONResponse({"status": "healthy"}, status_code=200)
     except Exception as e:
-        return JSONResponse({"status": "unhealthy", "error": str(e)}, 503)
+        return ORJSONResponse({"status": "unhealthy", "error": str(e)}, 503)
 
 
 @app.exception_handler(Exception)
-async def http_exception_handler(request: Request, exc: Exception) -> JSONResponse:
-    return JSONResponse(
+async def http_exception_handler(request: Request, exc: Exception) -> ORJSONResponse:
+    return ORJSONResponse(
         status_code=500,
         content={
             "error": f"Internal Server Error: {exc!s}",
@@ -2,9 +2,6 @@ from __future__ import annotations
 
 from typing import Iterable
 
-from langchain_core.documents import Document
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-
 from .models import DocumentChunkPayload, MarkdownDocument
 
 
@@ -36,39 +33,60 @@ class ChunkSplitter:
             )
         )
 
-        self._char_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=self._chunk_size,
-            chunk_overlap=self._chunk_overlap,
-            separators=self._separators,
-        )
+        self._break_separators = tuple(sep for sep in self._separators if sep)
 
     def split(self, document: MarkdownDocument) -> list[DocumentChunkPayload]:
-        base_document = Document(
-            page_content=document.content,
-            metadata=document.metadata or {},
-        )
-        chunk_documents = self._char_splitter.split_documents([base_document])
+        text = document.content
+        metadata = document.metadata or {}
         payloads: list[DocumentChunkPayload] = []
-        for index, doc in enumerate(chunk_documents):
-            text = doc.page_content.strip()
-            if not text:
+        for index, (start, end) in enumerate(self._chunk_bounds(text)):
+            chunk = text[start:end].strip()
+            if not chunk:
                 continue
 
             payloads.append(
-                DocumentChunkPayload(
-                    content=text,
-                    serial=index,
-                    metadata=doc.metadata,
-                )
+                DocumentChunkPayload(content=chunk, serial=index, metadata=metadata)
             )
 
-        if not payloads and document.content.strip():
+        if not payloads and text.strip():
             payloads.append(
                 DocumentChunkPayload(
-                    content=document.content.strip(),
+                    content=text.strip(),
                     serial=0,
                     metadata=document.metadata,
                 )
             )
 
         return payloads
+
+    def _chunk_bounds(self, text: str) -> list[tuple[int, int]]:
+        """Greedily pack ``text`` into (start, end) windows of at most chunk_size.
+
+        Each window is cut at the last occurrence of the highest-priority
+        separator that still leaves the chunk at least half full, or hard-cut
+        at chunk_size when no separator qualifies.
+        """
+        length = len(text)
+        bounds: list[tuple[int, int]] = []
+        start = 0
+        while start < length:
+            limit = start + self._chunk_size
+            if limit >= length:
+                bounds.append((start, length))
+                break
+
+            end = limit
+            min_end = start + self._chunk_size // 2
+            for separator in self._break_separators:
+                position = text.rfind(separator, min_end + 1, limit + len(separator))
+                if position != -1:
+                    end = position
+                    break
+            bounds.append((start, end))
+
+            # start the overlap on a word boundary so chunks never open mid-word
+            next_start = max(end - self._chunk_overlap, start + 1)
+            word_break = text.find(" ", next_start, end)
+            start = word_break if word_break != -1 else next_start
+
+        return bounds
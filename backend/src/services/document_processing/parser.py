@@ -3,11 +3,13 @@ from __future__ import annotations
 import asyncio
 import io
 from pathlib import Path
-from typing import Any, Callable
+from typing import Any, BinaryIO, Callable
 
 import structlog
+from charset_normalizer import from_bytes
 from docx import Document as DocxDocument
 from pdfminer.high_level import extract_text as pdf_extract_text
+from pdfminer.layout import LAParams
 from pptx import Presentation
 
 from .models import MarkdownDocument
@@ -15,21 +17,27 @@ from .models import MarkdownDocument
 
 logger = structlog.get_logger(__name__)
 
+DocumentContent = bytes | BinaryIO
+
+# boxes_flow=None orders text boxes top-to-bottom instead of running pdfminer's
+# quadratic hierarchical box grouping, which dominates extraction time
+_PDF_LAPARAMS = LAParams(boxes_flow=None)
+
 
 class DocumentParser:
     """Lightweight parser that converts common office formats into Markdown."""
 
     async def parse(
-        self, *, content_bytes: bytes, filename: str | None = None
+        self, *, content: DocumentContent, filename: str | None = None
     ) -> MarkdownDocument:
         return await asyncio.to_thread(
             self.parse_sync,
-            content_bytes=content_bytes,
+            content=content,
             filename=filename,
         )
 
     def parse_sync(
-        self, *, content_bytes: bytes, filename: str | None = None
+        self, *, content: DocumentContent, filename: str | None = None
     ) -> MarkdownDocument:
         """Synchronous helper for scripts and tests."""
         try:
@@ -42,9 +50,7 @@ class DocumentParser:
                 "parse_sync cannot be used inside an active event loop; call `await parse(...)` instead."
             )
 
-        markdown, metadata = self._parse_bytes(
-            content_bytes=content_bytes, filename=filename
-        )
+        markdown, metadata = self._parse_content(content=content, filename=filename)
         if not markdown.strip():
             raise RuntimeError("Parsed document is empty")
 
@@ -54,16 +60,16 @@ class DocumentParser:
     # Internal helpers
     # ------------------------------------------------------------------ #
 
-    def _parse_bytes(
-        self, *, content_bytes: bytes, filename: str | None
+    def _parse_content(
+        self, *, content: DocumentContent, filename: str | None
     ) -> tuple[str, dict[str, Any]]:
         extension = (Path(filename).suffix.lower() if filename else "") or ""
         parser = self._resolve_parser(extension)
-        return parser(content_bytes, filename or "document")
+        return parser(content, filename or "document")
 
     def _resolve_parser(
         self, extension: str
-    ) -> Callable[[bytes, str], tuple[str, dict[str, Any]]]:
+    ) -> Callable[[DocumentContent, str], tuple[str, dict[str, Any]]]:
         if extension == ".pdf":
             return self._parse_pdf
         if extension in {".docx", ".dotx"}:
@@ -73,10 +79,12 @@ class DocumentParser:
         return self._parse_plain_text
 
     def _parse_pdf(
-        self, content_bytes: bytes, filename: str
+        self, content: DocumentContent, filename: str
     ) -> tuple[str, dict[str, Any]]:
         try:
-            text = pdf_extract_text(io.BytesIO(content_bytes)) or ""
+            text = (
+                pdf_extract_text(self._as_stream(content), laparams=_PDF_LAPARAMS) or ""
+            )
         except Exception as exc:
             raise RuntimeError("Failed to parse PDF document") from exc
 
@@ -84,10 +92,10 @@ class DocumentParser:
         return markdown, self._base_metadata(filename)
 
     def _parse_docx(
-        self, content_bytes: bytes, filename: str
+        self, content: DocumentContent, filename: str
     ) -> tuple[str, dict[str, Any]]:
         try:
-            document = DocxDocument(io.BytesIO(content_bytes))
+            document = DocxDocument(self._as_stream(content))
         except Exception as exc:
             raise RuntimeError("Failed to parse DOCX document") from exc
 
@@ -117,10 +125,10 @@ class DocumentParser:
         return markdown, metadata
 
     def _parse_pptx(
-        self, content_bytes: bytes, filename: str
+        self, content: DocumentContent, filename: str
     ) -> tuple[str, dict[str, Any]]:
         try:
-            presentation = Presentation(io.BytesIO(content_bytes))
+            presentation = Presentation(self._as_stream(content))
         except Exception as exc:
             raise RuntimeError("Failed to parse PPTX document") from exc
 
@@ -159,8 +167,11 @@ class DocumentParser:
         return markdown, metadata
 
     def _parse_plain_text(
-        self, content_bytes: bytes, filename: str
+        self, content: DocumentContent, filename: str
     ) -> tuple[str, dict[str, Any]]:
+        content_bytes = (
+            content if isinstance(content, bytes) else self._as_stream(content).read()
+        )
         text = self._decode_bytes(content_bytes)
         markdown = self._normalize_text(text)
         return markdown, self._base_metadata(filename)
@@ -169,6 +180,12 @@ class DocumentParser:
     # Utility helpers
     # ------------------------------------------------------------------ #
 
+    def _as_stream(self, content: DocumentContent) -> BinaryIO:
+        if isinstance(content, bytes):
+            return io.BytesIO(content)
+        content.seek(0)
+        return content
+
     def _base_metadata(self, filename: str) -> dict[str, Any]:
         return {"source_filename": filename, "sections": []}
 
@@ -186,13 +203,19 @@ class DocumentParser:
         return None
 
     def _decode_bytes(self, content_bytes: bytes) -> str:
-        for encoding in ("utf-8", "utf-16", "cp1251", "latin-1"):
-            try:
-                return content_bytes.decode(encoding)
-            except UnicodeDecodeError:
-                continue
+        if content_bytes.isascii():
+            return content_bytes.decode("ascii")
+
+        try:
+            return content_bytes.decode("utf-8")
+        except UnicodeDecodeError:
+            pass
+
+        best_match = from_bytes(content_bytes).best()
+        if best_match is not None:
+            return str(best_match)
 
-        return content_bytes.decode("utf-8", errors="ignore")
+        return content_bytes.decode("latin-1")
 
     def _normalize_text(self, text: str) -> str:
         lines = [line.rstrip() for line in text.splitlines()]
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import os
 from typing import Any
 
 import structlog
@@ -14,7 +15,7 @@ from services.s3.s3_test import upload_to_s3
 
 from .chunk_splitter import ChunkSplitter
 from .models import DocumentChunkPayload, MarkdownDocument
-from .parser import DocumentParser
+from .parser import DocumentContent, DocumentParser
 from .vector_manager import ChunkRecord, DocumentVectorManager
 
 
@@ -54,14 +55,18 @@ class DocumentUploadPipeline:
         if await doc_repo.check_document_exists(filename, user):
             raise DocumentExistsError
 
-        content_bytes = await file.read()
-        self._ensure_file_size(content_bytes)
-        minio_url = await upload_to_s3(content_bytes, filename, user)
-
-        markdown_doc = await self._parse_document(
-            content_bytes=content_bytes,
-            filename=filename,
-        )
+        # the spooled upload file is passed on as-is instead of being read into
+        # memory; storage and parsers rewind it before use
+        stream = file.file
+        file_size = file.size
+        if file_size is None:
+            stream.seek(0, os.SEEK_END)
+            file_size = stream.tell()
+        self._ensure_file_size(file_size)
+
+        # parse before uploading so unparseable files never reach object storage
+        markdown_doc = await self._parse_document(content=stream, filename=filename)
+        minio_url = await upload_to_s3(stream, filename, user, length=file_size)
         chunk_payloads = self._chunk_splitter.split(markdown_doc)
 
         chunk_repo = DocumentChunkRepository(db)
@@ -103,8 +108,8 @@ class DocumentUploadPipeline:
 
         return document
 
-    def _ensure_file_size(self, content_bytes: bytes) -> None:
-        if len(content_bytes) > self._max_file_size_bytes:
+    def _ensure_file_size(self, file_size: int) -> None:
+        if file_size > self._max_file_size_bytes:
             raise HTTPException(
                 status_code=HTTP_413_REQUEST_ENTITY_TOO_LARGE,
                 detail="File is too large",
@@ -113,14 +118,11 @@ class DocumentUploadPipeline:
     async def _parse_document(
         self,
         *,
-        content_bytes: bytes,
+        content: DocumentContent,
         filename: str | None,
     ) -> MarkdownDocument:
         try:
-            markdown_doc = await self._parser.parse(
-                content_bytes=content_bytes,
-                filename=filename,
-            )
+            markdown_doc = await self._parser.parse(content=content, filename=filename)
         except Exception as exc:
             logger.error(
                 "document-parse-failed",
@@ -151,23 +153,20 @@ class DocumentUploadPipeline:
         document: ParsedDocument,
         chunk_payloads: list[DocumentChunkPayload],
     ) -> list[ChunkRecord]:
-        stored_chunks: list[ChunkRecord] = []
-
-        for payload in chunk_payloads:
-            chunk_content = payload.content
-            serial = payload.serial
-
-            doc_chunk = DocumentChunk(
-                chunk_content=chunk_content,
-                chunk_serial=serial,
+        doc_chunks = [
+            DocumentChunk(
+                chunk_content=payload.content,
+                chunk_serial=payload.serial,
                 document=document,
             )
-            await chunk_repo.create(doc_chunk)
-            stored_chunks.append(
-                ChunkRecord(chunk=doc_chunk, metadata=payload.metadata)
-            )
-
-        return stored_chunks
+            for payload in chunk_payloads
+        ]
+        await chunk_repo.create_many(doc_chunks)
+
+        return [
+            ChunkRecord(chunk=doc_chunk, metadata=payload.metadata)
+            for doc_chunk, payload in zip(doc_chunks, chunk_payloads)
+        ]
 
     async def _index_chunks(
         self,
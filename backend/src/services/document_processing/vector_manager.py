@@ -13,6 +13,15 @@ from services.qdrant.vector_store import QdrantVectorStore
 
 logger = structlog.get_logger(__name__)
 
+# chunk text is hydrated from Postgres, so only the citation fields are fetched
+_SEARCH_PAYLOAD_FIELDS = (
+    "chunk_id",
+    "document_id",
+    "filename",
+    "minio_url",
+    "document_metadata",
+)
+
 
 @dataclass(frozen=True)
 class ChunkRecord:
@@ -97,52 +106,101 @@ class DocumentVectorManager:
             logger.info("qdrant-disabled", reason="Qdrant URL not configured")
             return []
 
-        embeddings = await self._embedding_client.embed_texts([query])
-        if not embeddings:
-            return []
+        query_embedding = await self._embedding_client.embed_query(query)
 
         search_results = await self._vector_store.search_document_embeddings(
             user_id=user_id,
-            query_embedding=embeddings[0],
+            query_embedding=query_embedding,
             limit=limit,
             score_threshold=score_threshold,
             document_ids=document_ids,
+            payload_fields=_SEARCH_PAYLOAD_FIELDS,
         )
 
-        if not search_results:
-            return []
+        return (await self._hydrate_hits(chunk_repo, [search_results]))[0]
+
+    async def search_chunks_batch(
+        self,
+        *,
+        chunk_repo: DocumentChunkRepository,
+        user_id: int,
+        queries: Sequence[str],
+        limit: int = 5,
+        score_threshold: float | None = None,
+        document_ids: Sequence[int] | None = None,
+    ) -> list[list[VectorSearchResult]]:
+        """Search several queries with one embedding call, one Qdrant batch
+        request and one chunk lookup. Returns results per query, in order."""
+        active = [index for index, query in enumerate(queries) if query.strip()]
+        results: list[list[VectorSearchResult]] = [[] for _ in queries]
+        if not active:
+            return results
+
+        if not self._embedding_client.is_enabled:
+            logger.info(
+                "embedding-disabled", reason="OpenRouter API key not configured"
+            )
+            return results
 
-        chunk_ids: list[int] = []
-        for point in search_results:
-            payload = getattr(point, "payload", {}) or {}
-            chunk_id = payload.get("chunk_id") or getattr(point, "id", None)
-            if isinstance(chunk_id, str) and chunk_id.isdigit():
-                chunk_id = int(chunk_id)
-            if isinstance(chunk_id, int):
-                chunk_ids.append(chunk_id)
+        if not self._vector_store.is_enabled:
+            logger.info("qdrant-disabled", reason="Qdrant URL not configured")
+            return results
 
+        query_embeddings = await self._embedding_client.embed_queries(
+            [queries[index] for index in active]
+        )
+        search_results = await self._vector_store.search_document_embeddings_batch(
+            user_id=user_id,
+            query_embeddings=query_embeddings,
+            limit=limit,
+            score_threshold=score_threshold,
+            document_ids=document_ids,
+            payload_fields=_SEARCH_PAYLOAD_FIELDS,
+        )
+        hydrated = await self._hydrate_hits(chunk_repo, search_results)
+        for index, hits in zip(active, hydrated):
+            results[index] = hits
+        return results
+
+    @staticmethod
+    async def _hydrate_hits(
+        chunk_repo: DocumentChunkRepository, search_results: Sequence[Sequence[Any]]
+    ) -> list[list[VectorSearchResult]]:
+        parsed_hits: list[list[tuple[Any, dict[str, Any], int]]] = []
+        for points in search_results:
+            hits = []
+            for point in points:
+                payload = getattr(point, "payload", {}) or {}
+                chunk_id = _point_chunk_id(point, payload)
+                if chunk_id is not None:
+                    hits.append((point, payload, chunk_id))
+            parsed_hits.append(hits)
+
+        chunk_ids = {chunk_id for hits in parsed_hits for _, _, chunk_id in hits}
         if not chunk_ids:
-            return []
+            return [[] for _ in parsed_hits]
 
-        chunks = await chunk_repo.get_many_by_ids(chunk_ids)
+        chunks = await chunk_repo.get_many_by_ids(list(chunk_ids))
+        # the IN (...) lookup does not preserve the ranking order, hence the map
         chunk_map = {chunk.chunk_id: chunk for chunk in chunks}
 
-        results: list[VectorSearchResult] = []
-        for point in search_results:
-            payload = getattr(point, "payload", {}) or {}
-            chunk_id = payload.get("chunk_id") or getattr(point, "id", None)
-            if isinstance(chunk_id, str) and chunk_id.isdigit():
-                chunk_id = int(chunk_id)
-            chunk = chunk_map.get(chunk_id)
-            if not chunk:
-                continue
-
-            results.append(
+        return [
+            [
                 VectorSearchResult(
-                    chunk=chunk,
+                    chunk=chunk_map[chunk_id],
                     score=getattr(point, "score", 0.0),
                     payload=payload,
                 )
-            )
-
-        return results
+                for point, payload, chunk_id in hits
+                if chunk_id in chunk_map
+            ]
+            for hits in parsed_hits
+        ]
+
+
+def _point_chunk_id(point: Any, payload: dict[str, Any]) -> int | None:
+    chunk_id = payload.get("chunk_id") or getattr(point, "id", None)
+    try:
+        return int(chunk_id)
+    except (TypeError, ValueError):
+        return None
@@ -8,6 +8,7 @@ from db.models import User, ParsedDocument, DocumentChunk
 from db.repositories.chunk_repo import DocumentChunkRepository
 from services.document_processing import DocumentUploadPipeline, DocumentVectorManager
 from services.document_processing.vector_manager import VectorSearchResult
+from services.rag.semantic_cache import invalidate_user_retrieval_cache
 
 
 logger = structlog.get_logger(__name__)
@@ -18,7 +19,15 @@ MAX_FILE_SIZE_BYTES = MAX_FILE_SIZE_MB * 1024 * 1024
 # Lazy initialization - pipeline will be created when needed
 # This avoids importing heavy parsing dependencies until they are required
 _document_pipeline: DocumentUploadPipeline | None = None
-vector_manager = DocumentVectorManager()
+_vector_manager: DocumentVectorManager | None = None
+
+
+def _get_vector_manager() -> DocumentVectorManager:
+    """Get or create the shared vector manager on first use"""
+    global _vector_manager
+    if _vector_manager is None:
+        _vector_manager = DocumentVectorManager()
+    return _vector_manager
 
 
 def _get_document_pipeline() -> DocumentUploadPipeline:
@@ -26,7 +35,8 @@ def _get_document_pipeline() -> DocumentUploadPipeline:
     global _document_pipeline
     if _document_pipeline is None:
         _document_pipeline = DocumentUploadPipeline(
-            max_file_size_bytes=MAX_FILE_SIZE_BYTES
+            max_file_size_bytes=MAX_FILE_SIZE_BYTES,
+            vector_manager=_get_vector_manager(),
         )
     return _document_pipeline
 
@@ -47,7 +57,10 @@ async def process_document(
     file: UploadFile, db: AsyncSession, user: User
 ) -> ParsedDocument:
     pipeline = _get_document_pipeline()
-    return await pipeline.handle(file=file, db=db, user=user)
+    document = await pipeline.handle(file=file, db=db, user=user)
+    await db.commit()
+    invalidate_user_retrieval_cache(user.user_id)
+    return document
 
 
 async def search_document_chunks(
@@ -60,7 +73,7 @@ async def search_document_chunks(
     document_ids: Sequence[int] | None = None,
 ) -> Sequence[VectorSearchResult]:
     chunk_repo = DocumentChunkRepository(db)
-    return await vector_manager.search_chunks(
+    return await _get_vector_manager().search_chunks(
         chunk_repo=chunk_repo,
         user_id=user.user_id,
         query=query,
@@ -68,3 +81,23 @@ async def search_document_chunks(
         score_threshold=score_threshold,
         document_ids=document_ids,
     )
+
+
+async def search_document_chunks_batch(
+    *,
+    db: AsyncSession,
+    user: User,
+    queries: Sequence[str],
+    limit: int = 5,
+    score_threshold: float | None = None,
+    document_ids: Sequence[int] | None = None,
+) -> list[list[VectorSearchResult]]:
+    chunk_repo = DocumentChunkRepository(db)
+    return await _get_vector_manager().search_chunks_batch(
+        chunk_repo=chunk_repo,
+        user_id=user.user_id,
+        queries=queries,
+        limit=limit,
+        score_threshold=score_threshold,
+        document_ids=document_ids,
+    )
@@ -1,3 +1,3 @@
-from .openrouter import OpenRouterEmbeddingClient
+from .openrouter import OpenRouterEmbeddingClient, close_http_client
 
-__all__ = ["OpenRouterEmbeddingClient"]
+__all__ = ["OpenRouterEmbeddingClient", "close_http_client"]
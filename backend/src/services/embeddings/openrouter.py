@@ -1,12 +1,109 @@
 from __future__ import annotations
 
-import logging
-from typing import Sequence
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Sequence
 
 import httpx
+import numpy as np
+import orjson
+import structlog
 
 from config import settings
 
+logger = structlog.get_logger(__name__)
+
+_QUERY_CACHE_MAXSIZE = 1024
+_QUERY_CACHE_TTL_SECONDS = 600
+# (model, normalized query) -> (unit float32 embedding, expiry timestamp);
+# embeddings are deterministic per model
+_QUERY_CACHE: OrderedDict[tuple[str, str], tuple[np.ndarray, float]] = OrderedDict()
+
+# one pooled HTTP/2 connection set shared by every embedding client in the process
+_http_client: httpx.AsyncClient | None = None
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+class _QueryBatcher:
+    """Coalesce texts submitted within a short window into one embedding call.
+
+    Concurrent requests each embed a single query; joining them amortizes the
+    HTTP round trip. Identical texts in the same window share one future.
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[list[str]], Awaitable[np.ndarray]],
+        *,
+        window_seconds: float,
+        max_batch: int,
+    ) -> None:
+        self._embed = embed
+        self._window_seconds = window_seconds
+        self._max_batch = max(1, max_batch)
+        self._pending: dict[str, asyncio.Future[np.ndarray]] = {}
+        self._flush_handle: asyncio.TimerHandle | None = None
+        # keep references so in-flight batches are not garbage collected
+        self._running: set[asyncio.Task[None]] = set()
+
+    async def submit(self, texts: Sequence[str]) -> list[np.ndarray]:
+        loop = asyncio.get_running_loop()
+        futures = []
+        for text in texts:
+            future = self._pending.get(text)
+            if future is None:
+                future = self._pending[text] = loop.create_future()
+            futures.append(future)
+
+        if len(self._pending) >= self._max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self._window_seconds, self._flush)
+
+        # shielded: a cancelled caller must not cancel futures other callers share
+        return [await asyncio.shield(future) for future in futures]
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            task = asyncio.create_task(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: dict[str, asyncio.Future[np.ndarray]]) -> None:
+        try:
+            embeddings = await self._embed(list(batch))
+        except BaseException as exc:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(exc)
+            if isinstance(exc, asyncio.CancelledError):
+                raise
+            return
+        for future, embedding in zip(batch.values(), embeddings):
+            if not future.done():
+                future.set_result(embedding)
+
 
 class OpenRouterEmbeddingClient:
     DEFAULT_BASE_URL = "https://openrouter.ai/api/v1/embeddings"
@@ -20,6 +117,10 @@ class OpenRouterEmbeddingClient:
         referer: str | None = None,
         title: str | None = None,
         timeout_seconds: float = 30.0,
+        max_batch_items: int = 96,
+        max_batch_tokens: int = 250_000,
+        max_in_flight: int = 4,
+        coalesce_ms: float = 0.0,
     ) -> None:
         self._api_key = api_key
         self._model = model
@@ -27,6 +128,18 @@ class OpenRouterEmbeddingClient:
         self._referer = referer
         self._title = title
         self._timeout_seconds = timeout_seconds
+        self._max_batch_items = max(1, max_batch_items)
+        self._max_batch_tokens = max(1, max_batch_tokens)
+        self._max_in_flight = max(1, max_in_flight)
+        self._query_batcher = (
+            _QueryBatcher(
+                self.embed_texts,
+                window_seconds=coalesce_ms / 1000,
+                max_batch=self._max_batch_items,
+            )
+            if coalesce_ms > 0
+            else None
+        )
 
     @classmethod
     def from_settings(cls) -> "OpenRouterEmbeddingClient":
@@ -41,22 +154,112 @@ class OpenRouterEmbeddingClient:
             timeout_seconds=float(
                 getattr(settings, "OPENROUTER_TIMEOUT_SECONDS", 30.0)
             ),
+            max_batch_items=int(
+                getattr(settings, "OPENROUTER_EMBED_MAX_BATCH_ITEMS", 96)
+            ),
+            max_batch_tokens=int(
+                getattr(settings, "OPENROUTER_EMBED_MAX_BATCH_TOKENS", 250_000)
+            ),
+            max_in_flight=int(getattr(settings, "OPENROUTER_EMBED_CONCURRENCY", 4)),
+            coalesce_ms=float(getattr(settings, "OPENROUTER_EMBED_COALESCE_MS", 0.0)),
         )
 
     @property
     def is_enabled(self) -> bool:
         return bool(self._api_key)
 
-    async def embed_texts(self, texts: Sequence[str]) -> list[list[float]]:
+    async def embed_texts(self, texts: Sequence[str]) -> np.ndarray:
+        """Return an ``(len(texts), dim)`` float32 matrix of embeddings."""
         if not texts:
-            return []
+            return np.empty((0, 0), dtype=np.float32)
 
         if not self.is_enabled:
             raise RuntimeError("OpenRouter API key is not configured")
 
+        batches = self._split_batches(texts)
+        if len(batches) == 1:
+            return await self._embed_batch(batches[0])
+
+        semaphore = asyncio.Semaphore(self._max_in_flight)
+
+        async def _run(batch: list[str]) -> np.ndarray:
+            async with semaphore:
+                return await self._embed_batch(batch)
+
+        results = await asyncio.gather(*(_run(batch) for batch in batches))
+        return np.concatenate(results)
+
+    async def embed_query(self, query: str) -> np.ndarray:
+        """Return the L2-normalized float32 embedding of a search query.
+
+        Queries differing only in whitespace share a cache entry; the returned
+        array is read-only because it is shared between callers.
+        """
+        return (await self.embed_queries([query]))[0]
+
+    async def embed_queries(self, queries: Sequence[str]) -> list[np.ndarray]:
+        """Batch variant of :meth:`embed_query`; cache misses share one request."""
+        normalized_queries = [" ".join(query.split()) for query in queries]
+        now = time.monotonic()
+        found: dict[str, np.ndarray] = {}
+        for normalized_query in normalized_queries:
+            key = (self._model, normalized_query)
+            if (cached := _QUERY_CACHE.get(key)) is None:
+                continue
+            embedding, expires_at = cached
+            if expires_at > now:
+                _QUERY_CACHE.move_to_end(key)
+                found[normalized_query] = embedding
+            else:
+                _QUERY_CACHE.pop(key, None)
+
+        missing = [q for q in dict.fromkeys(normalized_queries) if q not in found]
+        if missing:
+            if self._query_batcher is not None:
+                embeddings = np.stack(await self._query_batcher.submit(missing))
+            else:
+                embeddings = await self.embed_texts(missing)
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            embeddings /= norms
+            expires_at = time.monotonic() + _QUERY_CACHE_TTL_SECONDS
+            for normalized_query, embedding in zip(missing, embeddings):
+                embedding.flags.writeable = False
+                found[normalized_query] = embedding
+                _QUERY_CACHE[(self._model, normalized_query)] = (embedding, expires_at)
+            while len(_QUERY_CACHE) > _QUERY_CACHE_MAXSIZE:
+                _QUERY_CACHE.popitem(last=False)
+
+        return [found[normalized_query] for normalized_query in normalized_queries]
+
+    def _split_batches(self, texts: Sequence[str]) -> list[list[str]]:
+        """Group texts into requests bounded by item count and estimated tokens.
+
+        Tokens are estimated as ~4 characters per token, which is close enough
+        to keep requests under the provider's input limits.
+        """
+        batches: list[list[str]] = []
+        current: list[str] = []
+        current_tokens = 0
+        for text in texts:
+            tokens = len(text) // 4 + 1
+            if current and (
+                len(current) >= self._max_batch_items
+                or current_tokens + tokens > self._max_batch_tokens
+            ):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(text)
+            current_tokens += tokens
+
+        if current:
+            batches.append(current)
+        return batches
+
+    async def _embed_batch(self, texts: list[str]) -> np.ndarray:
         payload = {
             "model": self._model,
-            "input": list(texts),
+            "input": texts,
         }
 
         headers = {
@@ -69,22 +272,31 @@ class OpenRouterEmbeddingClient:
         if self._title:
             headers["X-Title"] = self._title
 
-        async with httpx.AsyncClient(timeout=self._timeout_seconds) as client:
-            response = await client.post(self._base_url, json=payload, headers=headers)
+        response = await _get_http_client().post(
+            self._base_url,
+            content=orjson.dumps(payload),
+            headers=headers,
+            timeout=self._timeout_seconds,
+        )
 
         try:
             response.raise_for_status()
         except httpx.HTTPStatusError as exc:
-            logging.exception(
+            logger.error(
                 "openrouter-embedding-request-failed",
                 status_code=exc.response.status_code,
             )
             raise
 
-        data = response.json()
-        embeddings = [item["embedding"] for item in data.get("data", [])]
+        data = orjson.loads(response.content)
+        items = sorted(data.get("data", []), key=lambda item: item.get("index", 0))
+        embeddings = [item["embedding"] for item in items]
 
         if not embeddings:
             raise RuntimeError("OpenRouter returned no embeddings")
+        if len(embeddings) != len(texts):
+            raise RuntimeError(
+                "OpenRouter returned a different number of embeddings than inputs"
+            )
 
-        return embeddings
+        return np.asarray(embeddings, dtype=np.float32)
@@ -0,0 +1,29 @@
+"""
+One-off migration that removes the legacy ``chunk_content`` payload key from
+the document points in ``QDRANT_COLLECTION_NAME``; chunk text is read from
+Postgres.
+
+Usage (from backend/src):
+    python -m services.qdrant.strip_chunk_content
+"""
+
+from __future__ import annotations
+
+import asyncio
+
+from services.qdrant.vector_store import QdrantVectorStore
+
+
+async def run() -> None:
+    store = QdrantVectorStore.from_settings()
+    if not store.is_enabled:
+        raise RuntimeError("Qdrant is disabled. Set QDRANT_URL.")
+    await store.strip_chunk_content()
+
+
+def main() -> None:
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,38 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Sequence
+import asyncio
+from functools import cache
+from typing import TYPE_CHECKING, Iterable, Iterator, Sequence
 
+import numpy as np
 import structlog
 
-from qdrant_client import AsyncQdrantClient
-from qdrant_client.http.exceptions import UnexpectedResponse
-from qdrant_client.http.models import (
-    Distance,
-    FieldCondition,
-    Filter,
-    MatchAny,
-    MatchValue,
-    PointStruct,
-    VectorParams,
-)
-
 from config import settings
 
 if TYPE_CHECKING:
+    from qdrant_client import AsyncQdrantClient
+    from qdrant_client.http.models import FieldCondition, Filter, PointStruct
+
     from services.document_processing.vector_manager import ChunkRecord
 
 logger = structlog.get_logger(__name__)
 
 
+# qdrant_client pulls in grpc and its pydantic models (~1s), so it is only
+# imported once a store actually talks to Qdrant
+@cache
+def _payload_indexes() -> dict:
+    from qdrant_client.http import models
+
+    # every search filters on user_id and often on document_id; only exact lookups are needed
+    return {
+        field_name: models.IntegerIndexParams(
+            type=models.IntegerIndexType.INTEGER, lookup=True, range=False
+        )
+        for field_name in ("user_id", "document_id")
+    }
+
+
 class QdrantVectorStore:
     DEFAULT_COLLECTION_NAME = "document_chunks"
 
@@ -33,13 +42,41 @@ class QdrantVectorStore:
         url: str | None,
         collection_name: str | None = None,
         batch_size: int = 64,
+        prefer_grpc: bool = False,
+        grpc_port: int = 6334,
+        timeout: int | None = None,
+        upsert_concurrency: int = 4,
+        scalar_quantization: bool = False,
+        quantization_quantile: float = 0.99,
+        quantization_oversampling: float = 2.0,
+        vectors_on_disk: bool = False,
+        float16_vectors: bool = False,
+        hnsw_ef: int | None = None,
+        default_segment_number: int | None = None,
+        store_chunk_content: bool = False,
     ) -> None:
         self._url = url
         self._collection_name = collection_name or self.DEFAULT_COLLECTION_NAME
         self._batch_size = batch_size
-        self._client: AsyncQdrantClient | None = (
-            AsyncQdrantClient(url=url, prefer_grpc=False) if url else None
-        )
+        self._upsert_concurrency = max(1, upsert_concurrency)
+        self._scalar_quantization = scalar_quantization
+        self._quantization_quantile = quantization_quantile
+        self._quantization_oversampling = quantization_oversampling
+        self._vectors_on_disk = vectors_on_disk
+        self._float16_vectors = float16_vectors
+        self._hnsw_ef = hnsw_ef
+        self._default_segment_number = default_segment_number
+        # only the knowledge base keeps chunk text in Qdrant; documents live in Postgres
+        self._store_chunk_content = store_chunk_content
+        # vector size the collection was last checked or created for
+        self._verified_vector_size: int | None = None
+        self._client_kwargs = {
+            "url": url,
+            "prefer_grpc": prefer_grpc,
+            "grpc_port": grpc_port,
+            "timeout": timeout,
+        }
+        self._client_instance: AsyncQdrantClient | None = None
 
     @classmethod
     def from_settings(cls) -> "QdrantVectorStore":
@@ -47,74 +84,150 @@ class QdrantVectorStore:
             url=getattr(settings, "QDRANT_URL", None),
             collection_name=getattr(settings, "QDRANT_COLLECTION_NAME", None),
             batch_size=int(getattr(settings, "QDRANT_BATCH_SIZE", 64)),
+            prefer_grpc=bool(getattr(settings, "QDRANT_PREFER_GRPC", False)),
+            grpc_port=int(getattr(settings, "QDRANT_GRPC_PORT", 6334)),
+            timeout=getattr(settings, "QDRANT_TIMEOUT_SECONDS", None),
+            upsert_concurrency=int(getattr(settings, "QDRANT_UPSERT_CONCURRENCY", 4)),
+            scalar_quantization=bool(
+                getattr(settings, "QDRANT_SCALAR_QUANTIZATION", False)
+            ),
+            quantization_quantile=float(
+                getattr(settings, "QDRANT_QUANTIZATION_QUANTILE", 0.99)
+            ),
+            quantization_oversampling=float(
+                getattr(settings, "QDRANT_QUANTIZATION_OVERSAMPLING", 2.0)
+            ),
+            vectors_on_disk=bool(getattr(settings, "QDRANT_VECTORS_ON_DISK", False)),
+            float16_vectors=bool(getattr(settings, "QDRANT_FLOAT16_VECTORS", False)),
+            hnsw_ef=getattr(settings, "QDRANT_HNSW_EF", None),
+            default_segment_number=getattr(
+                settings, "QDRANT_DEFAULT_SEGMENT_NUMBER", None
+            ),
         )
 
     @property
     def is_enabled(self) -> bool:
-        return self._client is not None
+        return bool(self._url)
+
+    @property
+    def _client(self) -> AsyncQdrantClient | None:
+        if self._client_instance is None and self._url:
+            from qdrant_client import AsyncQdrantClient
+
+            self._client_instance = AsyncQdrantClient(**self._client_kwargs)
+        return self._client_instance
 
     async def upsert_document_embeddings(
         self,
         *,
         document,
         chunk_records: Sequence["ChunkRecord"],
-        embeddings: Sequence[Sequence[float]],
+        embeddings: np.ndarray,
         document_metadata: dict | None,
     ) -> None:
         if not self.is_enabled or not self._client:
             return
 
-        if not embeddings:
+        if len(embeddings) == 0:
             logger.warning("qdrant-no-embeddings", document_id=document.document_id)
             return
 
         vector_size = len(embeddings[0])
         await self._ensure_collection(vector_size)
 
-        points: list[PointStruct] = []
+        await self._upsert_batches(
+            self._iter_point_batches(
+                document=document,
+                chunk_records=chunk_records,
+                embeddings=embeddings,
+                document_metadata=document_metadata,
+            )
+        )
+
+        logger.info(
+            "qdrant-upsert-success",
+            document_id=document.document_id,
+            collection=self._collection_name,
+            points=min(len(chunk_records), len(embeddings)),
+        )
+
+    def _iter_point_batches(
+        self,
+        *,
+        document,
+        chunk_records: Sequence["ChunkRecord"],
+        embeddings: np.ndarray,
+        document_metadata: dict | None,
+    ) -> Iterator[list[PointStruct]]:
+        from qdrant_client.http.models import PointStruct
+
+        created_at = getattr(document, "created_at", None)
+        # fields shared by every chunk of the document are built once
+        base_payload = {
+            "document_id": document.document_id,
+            "user_id": document.user_id,
+            "filename": document.filename,
+            "minio_url": document.minio_url,
+            "document_created_at": created_at.isoformat() if created_at else None,
+            "document_metadata": document_metadata or {},
+        }
+
+        batch: list[PointStruct] = []
         for chunk_record, embedding in zip(chunk_records, embeddings):
+            chunk = chunk_record.chunk
             point_payload = {
-                "document_id": document.document_id,
-                "chunk_id": chunk_record.chunk.chunk_id,
-                "chunk_serial": chunk_record.chunk.chunk_serial,
-                "user_id": document.user_id,
-                "filename": document.filename,
-                "minio_url": document.minio_url,
-                "document_created_at": getattr(document, "created_at", None).isoformat()
-                if getattr(document, "created_at", None)
-                else None,
-                "document_metadata": document_metadata or {},
+                **base_payload,
+                "chunk_id": chunk.chunk_id,
+                "chunk_serial": chunk.chunk_serial,
                 "chunk_metadata": chunk_record.metadata or {},
-                "chunk_content": getattr(
-                    getattr(chunk_record, "chunk", None), "chunk_content", None
-                ),
             }
+            if self._store_chunk_content:
+                point_payload["chunk_content"] = chunk.chunk_content
 
-            points.append(
+            batch.append(
                 PointStruct(
-                    id=chunk_record.chunk.chunk_id,
-                    vector=list(embedding),
+                    id=chunk.chunk_id,
+                    vector=embedding.tolist(),
                     payload=point_payload,
                 )
             )
+            if len(batch) >= self._batch_size:
+                yield batch
+                batch = []
 
-        for start in range(0, len(points), self._batch_size):
-            batch = points[start : start + self._batch_size]
-            await self._client.upsert(
-                collection_name=self._collection_name,
-                points=batch,
-                wait=True,
-            )
+        if batch:
+            yield batch
 
-        logger.info(
-            "qdrant-upsert-success",
-            document_id=document.document_id,
-            collection=self._collection_name,
-            points=len(points),
-        )
+    async def _upsert_batches(self, batches: Iterable[list[PointStruct]]) -> None:
+        # points carry explicit ids, so batches can be written in any order; they
+        # are built lazily so only upsert_concurrency of them are held at once
+        pending: set[asyncio.Task] = set()
+        try:
+            for batch in batches:
+                if len(pending) >= self._upsert_concurrency:
+                    done, pending = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    for task in done:
+                        task.result()
+                pending.add(
+                    asyncio.create_task(
+                        self._client.upsert(
+                            collection_name=self._collection_name,
+                            points=batch,
+                            wait=True,
+                        )
+                    )
+                )
+            await asyncio.gather(*pending)
+        finally:
+            for task in pending:
+                task.cancel()
 
     async def _ensure_collection(self, vector_size: int) -> None:
-        if not self._client:
+        from qdrant_client.http.exceptions import UnexpectedResponse
+
+        if not self._client or self._verified_vector_size == vector_size:
             return
 
         try:
@@ -125,10 +238,7 @@ class QdrantVectorStore:
                 and "not found" not in str(exc).lower()
             ):
                 raise
-            await self._client.create_collection(
-                collection_name=self._collection_name,
-                vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE),
-            )
+            await self._create_collection(vector_size)
             logger.info(
                 "qdrant-collection-created",
                 collection=self._collection_name,
@@ -137,16 +247,15 @@ class QdrantVectorStore:
         except Exception as exc:
             if "not found" not in str(exc).lower():
                 raise
-            await self._client.create_collection(
-                collection_name=self._collection_name,
-                vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE),
-            )
+            await self._create_collection(vector_size)
             logger.info(
                 "qdrant-collection-created",
                 collection=self._collection_name,
                 vector_size=vector_size,
             )
         else:
+            await self._ensure_payload_indexes(collection_info.payload_schema or {})
+            await self._ensure_quantization(collection_info)
             params = getattr(collection_info.config.params, "vectors", None)
             current_size = getattr(params, "size", None) if params else None
             if current_size and current_size != vector_size:
@@ -157,22 +266,144 @@ class QdrantVectorStore:
                     required_size=vector_size,
                     action="recreate_collection",
                 )
-                await self._client.recreate_collection(
-                    collection_name=self._collection_name,
-                    vectors_config=VectorParams(
-                        size=vector_size, distance=Distance.COSINE
-                    ),
-                )
+                await self._create_collection(vector_size, recreate=True)
                 logger.info(
                     "qdrant-collection-recreated",
                     collection=self._collection_name,
                     vector_size=vector_size,
                 )
 
+        self._verified_vector_size = vector_size
+
+    async def _create_collection(
+        self, vector_size: int, recreate: bool = False
+    ) -> None:
+        from qdrant_client.http import models
+
+        vectors_config = models.VectorParams(
+            size=vector_size,
+            distance=models.Distance.COSINE,
+            on_disk=self._vectors_on_disk or None,
+            datatype=models.Datatype.FLOAT16 if self._float16_vectors else None,
+        )
+        optimizers_config = (
+            models.OptimizersConfigDiff(
+                default_segment_number=self._default_segment_number
+            )
+            if self._default_segment_number
+            else None
+        )
+        create = (
+            self._client.recreate_collection
+            if recreate
+            else self._client.create_collection
+        )
+        await create(
+            collection_name=self._collection_name,
+            vectors_config=vectors_config,
+            quantization_config=self._quantization_config(),
+            optimizers_config=optimizers_config,
+        )
+        await self._ensure_payload_indexes({})
+
+    def _quantization_config(self):
+        from qdrant_client.http import models
+
+        if not self._scalar_quantization:
+            return None
+        # int8 copies stay in RAM for the HNSW walk; originals are only read to rescore
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8,
+                quantile=self._quantization_quantile,
+                always_ram=True,
+            )
+        )
+
+    def _search_params(self, hnsw_ef: int | None = None):
+        from qdrant_client.http import models
+
+        hnsw_ef = hnsw_ef or self._hnsw_ef
+        if not self._scalar_quantization and not hnsw_ef:
+            return None
+        return models.SearchParams(
+            hnsw_ef=hnsw_ef,
+            # fetch oversampling * limit candidates on int8 vectors, then rescore
+            # them with the original vectors to keep recall
+            quantization=models.QuantizationSearchParams(
+                rescore=True,
+                oversampling=self._quantization_oversampling,
+            )
+            if self._scalar_quantization
+            else None,
+        )
+
+    async def _ensure_quantization(self, collection_info) -> None:
+        """Quantize collections created before quantization was enabled."""
+        if not self._scalar_quantization or collection_info.config.quantization_config:
+            return
+
+        from qdrant_client.http import models
+
+        await self._client.update_collection(
+            collection_name=self._collection_name,
+            # "" addresses the collection's single unnamed vector
+            vectors_config={"": models.VectorParamsDiff(on_disk=True)}
+            if self._vectors_on_disk
+            else None,
+            quantization_config=self._quantization_config(),
+        )
+        logger.info(
+            "qdrant-collection-quantized",
+            collection=self._collection_name,
+        )
+
+    async def strip_chunk_content(self) -> None:
+        """Drop chunk_content from points written before it left the payload.
+
+        A whole-collection write, so it is run once by hand
+        (``python -m services.qdrant.strip_chunk_content``), never on startup.
+        """
+        if not self._client:
+            return
+        if self._store_chunk_content:
+            raise ValueError(
+                f"collection {self._collection_name} keeps chunk_content by design"
+            )
+
+        from qdrant_client.http.models import Filter
+
+        await self._client.delete_payload(
+            collection_name=self._collection_name,
+            keys=["chunk_content"],
+            points=Filter(must=[]),
+            wait=True,
+        )
+        logger.info("qdrant-chunk-content-stripped", collection=self._collection_name)
+
+    async def _ensure_payload_indexes(self, existing_schema: dict) -> None:
+        for field_name, field_schema in _payload_indexes().items():
+            if field_name in existing_schema:
+                continue
+            await self._client.create_payload_index(
+                collection_name=self._collection_name,
+                field_name=field_name,
+                field_schema=field_schema,
+                wait=True,
+            )
+            logger.info(
+                "qdrant-payload-index-created",
+                collection=self._collection_name,
+                field=field_name,
+            )
+
     async def drop_collection(self) -> None:
+        from qdrant_client.http.exceptions import UnexpectedResponse
+
         if not self._client:
             return
 
+        self._verified_vector_size = None
         try:
             await self._client.delete_collection(collection_name=self._collection_name)
             logger.info(
@@ -203,38 +434,34 @@ class QdrantVectorStore:
         self,
         *,
         user_id: int,
-        query_embedding: Sequence[float],
+        query_embedding: Sequence[float] | np.ndarray,
         limit: int,
         score_threshold: float | None = None,
         document_ids: Sequence[int] | None = None,
         extra_filter_conditions: Sequence[FieldCondition] | None = None,
+        payload_fields: Sequence[str] | None = None,
+        hnsw_ef: int | None = None,
     ):
         if not self.is_enabled or not self._client:
             return []
 
-        filter_conditions = [
-            FieldCondition(key="user_id", match=MatchValue(value=user_id))
-        ]
+        from qdrant_client.http.models import PayloadSelectorInclude
 
-        if document_ids:
-            filter_conditions.append(
-                FieldCondition(
-                    key="document_id",
-                    match=MatchAny(any=[int(doc_id) for doc_id in document_ids]),
-                )
-            )
-
-        if extra_filter_conditions:
-            filter_conditions.extend(extra_filter_conditions)
-
-        qdrant_filter = Filter(must=filter_conditions)
+        qdrant_filter = self._build_filter(
+            user_id=user_id,
+            document_ids=document_ids,
+            extra_filter_conditions=extra_filter_conditions,
+        )
 
         results = await self._client.search(
             collection_name=self._collection_name,
-            query_vector=list(query_embedding),
+            query_vector=np.asarray(query_embedding, dtype=np.float32).tolist(),
             limit=limit,
             query_filter=qdrant_filter,
-            with_payload=True,
+            search_params=self._search_params(hnsw_ef),
+            with_payload=PayloadSelectorInclude(include=list(payload_fields))
+            if payload_fields
+            else True,
             with_vectors=False,
         )
 
@@ -247,3 +474,80 @@ class QdrantVectorStore:
             if getattr(point, "score", 0.0) >= score_threshold
         ]
         return filtered_results
+
+    async def search_document_embeddings_batch(
+        self,
+        *,
+        user_id: int,
+        query_embeddings: Sequence[Sequence[float] | np.ndarray],
+        limit: int,
+        score_threshold: float | None = None,
+        document_ids: Sequence[int] | None = None,
+        payload_fields: Sequence[str] | None = None,
+        hnsw_ef: int | None = None,
+    ) -> list[list]:
+        """Run several searches with the same filter in a single request.
+
+        Returns one list of points per query embedding, in input order.
+        """
+        if not query_embeddings:
+            return []
+        if not self.is_enabled or not self._client:
+            return [[] for _ in query_embeddings]
+
+        from qdrant_client.http.models import PayloadSelectorInclude, QueryRequest
+
+        qdrant_filter = self._build_filter(user_id=user_id, document_ids=document_ids)
+        search_params = self._search_params(hnsw_ef)
+        with_payload = (
+            PayloadSelectorInclude(include=list(payload_fields))
+            if payload_fields
+            else True
+        )
+        responses = await self._client.query_batch_points(
+            collection_name=self._collection_name,
+            requests=[
+                QueryRequest(
+                    query=np.asarray(embedding, dtype=np.float32).tolist(),
+                    filter=qdrant_filter,
+                    params=search_params,
+                    limit=limit,
+                    score_threshold=score_threshold,
+                    with_payload=with_payload,
+                    with_vector=False,
+                )
+                for embedding in query_embeddings
+            ],
+        )
+        return [list(response.points) for response in responses]
+
+    @staticmethod
+    def _build_filter(
+        *,
+        user_id: int,
+        document_ids: Sequence[int] | None = None,
+        extra_filter_conditions: Sequence[FieldCondition] | None = None,
+    ) -> Filter:
+        from qdrant_client.http.models import (
+            FieldCondition,
+            Filter,
+            MatchAny,
+            MatchValue,
+        )
+
+        filter_conditions = [
+            FieldCondition(key="user_id", match=MatchValue(value=user_id))
+        ]
+
+        if document_ids:
+            filter_conditions.append(
+                FieldCondition(
+                    key="document_id",
+                    match=MatchAny(any=[int(doc_id) for doc_id in document_ids]),
+                )
+            )
+
+        if extra_filter_conditions:
+            filter_conditions.extend(extra_filter_conditions)
+
+        return Filter(must=filter_conditions)
@@ -1,21 +1,27 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import math
+import re
 import time
-from datetime import date, datetime, timezone
+from datetime import datetime, timezone
+from contextlib import aclosing
 from decimal import Decimal
-from dataclasses import dataclass
+from pathlib import Path
+from dataclasses import dataclass, replace
+from functools import cached_property
 from types import SimpleNamespace
-from typing import Any, Sequence
-from urllib.parse import urlparse
+from typing import Any, AsyncIterator, Callable, Sequence
+from urllib.parse import urlsplit
 
+import numpy as np
+import orjson
 import structlog
-from qdrant_client.http.models import FieldCondition, MatchValue
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from config import settings
-from db.models import ParsedDocument, User
+from db.models import MessageType, ParsedDocument, User
 from db.repositories.document_repo import ParsedDocumentRepository
 from db.repositories.message_repo import MessageRepository
 from services.document_processing.vector_manager import (
@@ -29,9 +35,14 @@ from services.rag.configuration import (
     RagAgentSettings,
     load_rag_agent_settings,
 )
-from services.rag.external_clients import CentralBankClient, TavilyClient
+from services.rag.external_clients import (
+    CachedValue,
+    CentralBankClient,
+    TavilyClient,
+)
 from services.rag.fusion_planner import FusionPlanner, FusionPlan
 from services.rag.openrouter_chat import OpenRouterChatClient
+from services.rag.semantic_cache import on_user_documents_changed, retrieval_cache
 from services.rag.tool_registry import (
     ToolContext,
     ToolDefinition,
@@ -45,6 +56,28 @@ from services.rag.context_manager import TokenAwareContextManager
 
 logger = structlog.get_logger(__name__)
 
+_HISTORY_ROLES = {MessageType.MODEL: "assistant"}
+# orjson encodes datetime/date natively, so its default hook only sees these
+# (anything else falls back to str)
+_JSON_DEFAULTS: dict[type, Callable[[Any], Any]] = {
+    Decimal: float,
+    set: list,
+    frozenset: list,
+}
+
+
+@dataclass(frozen=True)
+class StreamReset:
+    """Streamed signal: discard the text streamed so far.
+
+    Sent when a turn that began with text (e.g. "Сейчас поищу…") turns out to
+    call tools; the answer is then streamed again from the start.
+    """
+
+
+STREAM_RESET = StreamReset()
+DeltaCallback = Callable[[str | StreamReset], None]
+
 
 @dataclass
 class AgentResult:
@@ -72,6 +105,60 @@ class VectorSearchError(Exception):
 
 
 class RagAgent:
+    _SEARCH_KEYWORDS_RE = re.compile(
+        "найти|найди|ищи|поиск|где|какой договор|какой документ|покажи|подбери"
+    )
+    _CYRILLIC_RE = re.compile("[а-яё]", re.IGNORECASE)
+    # small-talk triggers, matched anywhere in the lowercased query
+    _GREETING_RE = re.compile(
+        "привет|здравствуй|добрый день|добрый вечер|доброе утро|hi|hello"
+    )
+    _IDENTITY_RE = re.compile(
+        "кто ты|что ты умеешь|что ты|расскажи о себе|твои возможности"
+    )
+    # (scenario, intent) -> tools; (scenario, None) is the scenario's fallback.
+    # Scenario 5 (clarification) and unknown scenarios get no tools.
+    _TOOLS_BY_SCENARIO_INTENT: dict[tuple[int, str | None], tuple[str, ...]] = {
+        # Document search - only user documents
+        (1, None): ("search_user_documents",),
+        # General request - no tools for predefined responses, else by intent
+        (2, "small_talk"): (),
+        (2, "off_topic"): (),
+        (2, "cbr_rate"): ("fetch_cbr_data",),
+        (2, "finance_news"): ("fetch_finance_news",),
+        (2, "knowledge_base"): ("search_general_kb",),
+        # Multi-tool scenario: both knowledge base and user documents
+        (2, "hybrid_kb_docs"): ("search_general_kb", "search_user_documents"),
+        # Fallback: allow corporate knowledge base search
+        (2, None): ("search_general_kb",),
+        # Full document context
+        (3, None): ("load_documents_full",),
+        # Targeted search in selected documents
+        (4, None): ("search_user_documents",),
+    }
+    # intents answered from live data: only the last exchange can matter
+    # (e.g. "а на вчера?"), older turns just add prefill tokens
+    _SELF_CONTAINED_INTENTS = frozenset({"cbr_rate", "finance_news"})
+    _SELF_CONTAINED_HISTORY_TAIL = 2
+    _DOCUMENTS_LENGTH_CACHE_TTL_SECONDS = 60
+    _DOCUMENTS_LENGTH_CACHE_MAXSIZE = 1024
+    # general answer format; specific formatting lives in the system prompt
+    _ANSWER_FORMAT_INSTRUCTIONS = (
+        "Адаптируй формат ответа под сложность вопроса:\n"
+        "- Простой вопрос: краткий прямой ответ (1-3 абзаца).\n"
+        "- Средней сложности: структура с разделами 'Ответ' и 'Источники'.\n"
+        "- Сложный вопрос: полная структура с 'Краткий вывод', 'Подробный анализ', 'Источники'.\n"
+        "\nИсточники указывай строго в формате:\n"
+        "- [Название файла](URL) — для документов пользователя\n"
+        "- [Финансовая база знаний] — для корпоративной БЗ\n"
+        "- [cbr.ru] — для данных ЦБ РФ\n"
+        "- [Название статьи](URL) — для веб-поиска\n"
+        "\nНЕ используй технические термины типа 'Tavily API', 'чанк', 'векторный поиск'."
+    )
+    _VECTOR_SEARCH_UNAVAILABLE_MESSAGE = (
+        "Не удалось подключиться к базе векторного поиска документов. "
+        "Пожалуйста, повторите запрос чуть позже или сообщите администратору, если проблема сохраняется."
+    )
     _RUSSIAN_NEWS_DOMAINS = (
         "cbr.ru",
         "tass.ru",
@@ -97,6 +184,11 @@ class RagAgent:
         config: RagAgentSettings | None = None,
     ) -> None:
         self._chat = chat_client or OpenRouterChatClient.from_settings()
+        base = Path(__file__).with_suffix("").parent / "prompt_storage"
+        self._system_prompt = (base / "system_ru.txt").read_text(encoding="utf-8")
+        self._orchestrator_prompt = (base / "orchestrator_ru.txt").read_text(
+            encoding="utf-8"
+        )
         self._vectors = vector_manager or DocumentVectorManager()
         self._config = config or load_rag_agent_settings()
         self._messages_limit = self._config.messages_limit
@@ -106,28 +198,7 @@ class RagAgent:
         self._rrf_k = self._config.rrf_k
         self._default_use_query_expansion = bool(self._config.use_query_expansion)
         self._kb_settings = self._config.knowledge_base
-        self._kb_embeddings = OpenRouterEmbeddingClient.from_settings()
-        self._kb_store = QdrantVectorStore(
-            url=getattr(settings, "QDRANT_URL", None),
-            collection_name=self._kb_settings.collection_name,
-            batch_size=int(getattr(settings, "QDRANT_BATCH_SIZE", 64)),
-        )
-        self._fusion_planner = FusionPlanner(
-            chat_client=self._chat,
-            prompt_params=self._config.prompts.fusion,
-            history_tail=self._config.orchestrator_history_tail,
-        )
         self._tool_registry = self._build_tool_registry()
-        self._cbr_client = CentralBankClient(
-            base_url=settings.CBR_API_BASE_URL,
-            cache_ttl_seconds=int(settings.CBR_CACHE_TTL_SECONDS),
-        )
-        self._tavily_client = TavilyClient(
-            api_key=settings.TAVILY_API_KEY,
-            base_url=settings.TAVILY_BASE_URL,
-            timeout_seconds=float(settings.TAVILY_TIMEOUT_SECONDS),
-            cache_ttl_seconds=int(settings.TAVILY_CACHE_TTL_SECONDS),
-        )
 
         # Initialize parallel executor with retry logic
         max_retries = int(getattr(settings, "RAG_MAX_TOOL_RETRIES", 2))
@@ -148,6 +219,79 @@ class RagAgent:
             ),
         )
         self._preferred_news_domains = set(self._RUSSIAN_NEWS_DOMAINS)
+        # the orchestrator runs on every request with the same sampling params
+        self._orchestrator_chat_kwargs: dict[str, Any] = {
+            **self._prompt_kwargs(self._config.prompts.orchestrator),
+            "response_format": {"type": "json_object"},
+        }
+        # tool JSON schemas and guidance text only depend on the tool set / intent
+        self._tool_specs_cache: dict[tuple[str, ...], list[dict[str, Any]]] = {}
+        self._guidance_cache: dict[str | None, str] = {}
+        self._response_cache: dict[tuple[int, str, str | None], CachedValue] = {}
+        self._response_cache_ttl = int(settings.RAG_RESPONSE_CACHE_TTL_SECONDS)
+        self._response_cache_maxsize = int(settings.RAG_RESPONSE_CACHE_MAXSIZE)
+        # answers may quote the user's documents: drop them on upload/deletion
+        on_user_documents_changed(self._forget_user_responses)
+        self._documents_length_cache: dict[
+            tuple[int, tuple[int, ...]], CachedValue
+        ] = {}
+
+    # clients only some scenarios need are built on first use, so document-only
+    # and small-talk traffic never pays for them
+    @cached_property
+    def _kb_embeddings(self) -> OpenRouterEmbeddingClient:
+        return OpenRouterEmbeddingClient.from_settings()
+
+    @cached_property
+    def _kb_store(self) -> QdrantVectorStore:
+        return QdrantVectorStore(
+            url=getattr(settings, "QDRANT_URL", None),
+            collection_name=self._kb_settings.collection_name,
+            batch_size=int(getattr(settings, "QDRANT_BATCH_SIZE", 64)),
+            prefer_grpc=bool(getattr(settings, "QDRANT_PREFER_GRPC", False)),
+            grpc_port=int(getattr(settings, "QDRANT_GRPC_PORT", 6334)),
+            timeout=getattr(settings, "QDRANT_TIMEOUT_SECONDS", None),
+            scalar_quantization=bool(
+                getattr(settings, "QDRANT_SCALAR_QUANTIZATION", False)
+            ),
+            quantization_quantile=float(
+                getattr(settings, "QDRANT_QUANTIZATION_QUANTILE", 0.99)
+            ),
+            quantization_oversampling=float(
+                getattr(settings, "QDRANT_QUANTIZATION_OVERSAMPLING", 2.0)
+            ),
+            vectors_on_disk=bool(getattr(settings, "QDRANT_VECTORS_ON_DISK", False)),
+            float16_vectors=bool(getattr(settings, "QDRANT_FLOAT16_VECTORS", False)),
+            hnsw_ef=getattr(settings, "QDRANT_HNSW_EF", None),
+            default_segment_number=getattr(
+                settings, "QDRANT_DEFAULT_SEGMENT_NUMBER", None
+            ),
+            store_chunk_content=True,
+        )
+
+    @cached_property
+    def _fusion_planner(self) -> FusionPlanner:
+        return FusionPlanner(
+            chat_client=self._chat,
+            prompt_params=self._config.prompts.fusion,
+            history_tail=self._config.orchestrator_history_tail,
+        )
+
+    @cached_property
+    def _cbr_client(self) -> CentralBankClient:
+        return CentralBankClient(
+            base_url=settings.CBR_API_BASE_URL,
+            cache_ttl_seconds=int(settings.CBR_CACHE_TTL_SECONDS),
+        )
+
+    @cached_property
+    def _tavily_client(self) -> TavilyClient:
+        return TavilyClient(
+            api_key=settings.TAVILY_API_KEY,
+            base_url=settings.TAVILY_BASE_URL,
+            timeout_seconds=float(settings.TAVILY_TIMEOUT_SECONDS),
+            cache_ttl_seconds=int(settings.TAVILY_CACHE_TTL_SECONDS),
+        )
 
     async def run(
         self,
@@ -158,16 +302,143 @@ class RagAgent:
         chat_id: int | None = None,
         selected_document_ids: Sequence[int] | None = None,
         answer_instructions: str | None = None,
+        on_delta: DeltaCallback | None = None,
     ) -> AgentResult:
-        current_dt = datetime.now(timezone.utc)
-        current_dt_iso = current_dt.isoformat()
+        """Answer ``query``; ``on_delta`` receives the final answer text as the
+        model streams it, or ``STREAM_RESET`` when text streamed so far is not
+        part of the answer (answers that are not generated by the model, e.g.
+        cached or predefined ones, are not streamed)."""
         history = await self._load_chat_history(db, chat_id) if chat_id else []
-        decision = await self._choose_scenario(
+
+        # only the opening turn of a chat without selected documents is cacheable:
+        # later turns depend on the conversation so far
+        cache_key: tuple[int, str, str | None] | None = None
+        if len(history) <= 1 and not selected_document_ids:
+            cache_key = (
+                user.user_id,
+                " ".join(query.lower().split()),
+                answer_instructions,
+            )
+            cached = self._response_cache.get(cache_key)
+            if cached and cached.expires_at > time.time():
+                result: AgentResult = cached.value
+                return replace(result, debug={**result.debug, "response_cache": "hit"})
+
+        result = await self._answer(
+            db=db,
+            user=user,
             query=query,
             history=history,
-            selected_ids=selected_document_ids,
-            current_datetime=current_dt_iso,
+            selected_document_ids=selected_document_ids,
+            answer_instructions=answer_instructions,
+            on_delta=on_delta,
         )
+        if cache_key is not None:
+            self._cache_response(cache_key, result)
+        return result
+
+    async def run_stream(
+        self,
+        *,
+        db: AsyncSession,
+        user: User,
+        query: str,
+        chat_id: int | None = None,
+        selected_document_ids: Sequence[int] | None = None,
+        answer_instructions: str | None = None,
+    ) -> AsyncIterator[str | StreamReset | AgentResult]:
+        """Streaming variant of :meth:`run`.
+
+        Yields answer text deltas as they are generated, ``STREAM_RESET`` when
+        the text yielded so far must be discarded, then the complete
+        ``AgentResult`` as the last item. Answers that are not streamed by the
+        model are yielded as a single delta.
+        """
+        deltas: asyncio.Queue[str | StreamReset | None] = asyncio.Queue()
+        task = asyncio.create_task(
+            self.run(
+                db=db,
+                user=user,
+                query=query,
+                chat_id=chat_id,
+                selected_document_ids=selected_document_ids,
+                answer_instructions=answer_instructions,
+                on_delta=deltas.put_nowait,
+            )
+        )
+        task.add_done_callback(lambda _: deltas.put_nowait(None))
+
+        streamed = False
+        try:
+            while (delta := await deltas.get()) is not None:
+                streamed = delta is not STREAM_RESET
+                yield delta
+            result = await task
+        finally:
+            # the client may disconnect mid-answer
+            task.cancel()
+
+        if not streamed and result.answer:
+            yield result.answer
+        yield result
+
+    def _cache_response(
+        self, cache_key: tuple[int, str, str | None], result: AgentResult
+    ) -> None:
+        intent = (result.debug.get("scenario_decision") or {}).get("intent")
+        if "vector_search_error" in result.debug or not (
+            result.scenario in {1, 2} or intent in {"small_talk", "off_topic"}
+        ):
+            return
+
+        ttl = (
+            settings.CBR_CACHE_TTL_SECONDS
+            if intent == "cbr_rate"
+            else self._response_cache_ttl
+        )
+        self._response_cache.pop(cache_key, None)
+        self._response_cache[cache_key] = CachedValue(
+            value=result, expires_at=time.time() + ttl
+        )
+        if len(self._response_cache) > self._response_cache_maxsize:
+            # dicts keep insertion order, so the first key is the oldest entry
+            self._response_cache.pop(next(iter(self._response_cache)))
+
+    def _forget_user_responses(self, user_id: int) -> None:
+        for key in [key for key in self._response_cache if key[0] == user_id]:
+            del self._response_cache[key]
+
+    async def _answer(
+        self,
+        *,
+        db: AsyncSession,
+        user: User,
+        query: str,
+        history: list[dict[str, str]],
+        selected_document_ids: Sequence[int] | None,
+        answer_instructions: str | None,
+        on_delta: DeltaCallback | None = None,
+    ) -> AgentResult:
+        current_dt = datetime.now(timezone.utc)
+        current_dt_iso = current_dt.isoformat()
+        # the selected documents' size is looked up while the orchestrator LLM call
+        # is in flight; the session is free because the orchestrator does not touch it
+        documents_task = (
+            asyncio.create_task(
+                self._selected_documents_length(db, user.user_id, selected_document_ids)
+            )
+            if selected_document_ids
+            else None
+        )
+        try:
+            decision = await self._choose_scenario(
+                query=query,
+                history=history,
+                selected_ids=selected_document_ids,
+                current_datetime=current_dt_iso,
+            )
+        finally:
+            selected_total_len = await documents_task if documents_task else None
         scenario = decision.scenario
 
         used_chunks: list[VectorSearchResult] = []
@@ -189,7 +460,10 @@ class RagAgent:
         if decision.follow_up:
             scenario = 5
             answer = await self._ask_clarification(
-                query=query, history=history, clarifications=decision.clarifications
+                query=query,
+                history=history,
+                clarifications=decision.clarifications,
+                on_delta=on_delta,
             )
             return AgentResult(
                 answer=answer, used_chunks=used_chunks, scenario=scenario, debug=debug
@@ -199,8 +473,10 @@ class RagAgent:
 
         scenario, precomputed_debug = await self._adjust_scenario_for_documents(
             db=db,
+            user_id=user.user_id,
             selected_ids=selected_document_ids,
             scenario=scenario,
+            total_len=selected_total_len,
         )
         debug.update(precomputed_debug)
 
@@ -219,7 +495,10 @@ class RagAgent:
             and decision.intent != "off_topic"
         ):
             answer = await self._ask_clarification(
-                query=query, history=history, clarifications=decision.clarifications
+                query=query,
+                history=history,
+                clarifications=decision.clarifications,
+                on_delta=on_delta,
             )
         else:
             try:
@@ -235,12 +514,13 @@ class RagAgent:
                     intent=decision.intent,
                     current_datetime=current_dt_iso,
                     use_query_expansion=decision.use_query_expansion,
+                    on_delta=on_delta,
                 )
                 debug["tool_calls"] = tool_usage
             except VectorSearchError as exc:
                 logger.warning("vector-search-unavailable", reason=str(exc))
                 debug["vector_search_error"] = str(exc)
-                answer = self._vector_search_unavailable_message()
+                answer = self._VECTOR_SEARCH_UNAVAILABLE_MESSAGE
 
         return AgentResult(
             answer=answer, used_chunks=used_chunks, scenario=scenario, debug=debug
@@ -249,13 +529,20 @@ class RagAgent:
     async def _load_chat_history(
         self, db: AsyncSession, chat_id: int
     ) -> list[dict[str, str]]:
-        msgs = await MessageRepository(db).get_last_for_chat(
+        rows = await MessageRepository(db).get_last_for_chat(
             chat_id=chat_id, limit=self._messages_limit
         )
+        # the query already caps history at messages_limit, so call sites use it
+        # as is; adjacent repeats (a resent question, a retried reply) are dropped
+        role_of = _HISTORY_ROLES.get
         history: list[dict[str, str]] = []
-        for m in msgs:
-            role = "assistant" if m.message_type.name == "MODEL" else "user"
-            history.append({"role": role, "content": m.content})
+        previous: tuple[str, str] | None = None
+        for message_type, content in rows:
+            current = (role_of(message_type, "user"), content)
+            if current == previous:
+                continue
+            history.append({"role": current[0], "content": content})
+            previous = current
         return history
 
     async def _choose_scenario(
@@ -266,17 +553,11 @@ class RagAgent:
         selected_ids: Sequence[int] | None,
         current_datetime: str,
     ) -> ScenarioDecision:
-        from pathlib import Path
-
-        base = Path(__file__).with_suffix("").parent / "prompt_storage"
-        system_prompt = (base / "system_ru.txt").read_text(encoding="utf-8")
-        orchestrator_prompt = (base / "orchestrator_ru.txt").read_text(encoding="utf-8")
-
         rule_guess = self._rule_guess_scenario(
             query=query, history=history, selected_ids=selected_ids
         )
-        sys_msg = {"role": "system", "content": system_prompt}
-        orch_msg = {"role": "system", "content": orchestrator_prompt}
+        sys_msg = {"role": "system", "content": self._system_prompt}
+        orch_msg = {"role": "system", "content": self._orchestrator_prompt}
         user_msg = {
             "role": "user",
             "content": json.dumps(
@@ -294,11 +575,8 @@ class RagAgent:
 
         history_tail = self._config.orchestrator_history_tail
         messages = [sys_msg, orch_msg, *history[-history_tail:], user_msg]
-        prompt_params = self._config.prompts.orchestrator
         resp = await self._chat.chat(
-            messages=messages,
-            **self._prompt_kwargs(prompt_params),
-            response_format={"type": "json_object"},
+            messages=messages, **self._orchestrator_chat_kwargs
         )
         try:
             content = resp["choices"][0]["message"]["content"]
@@ -349,18 +627,7 @@ class RagAgent:
         if selected_ids and len(selected_ids) > 0:
             return 3
         q = (query or "").lower()
-        search_keywords = (
-            "найти",
-            "найди",
-            "ищи",
-            "поиск",
-            "где",
-            "какой договор",
-            "какой документ",
-            "покажи",
-            "подбери",
-        )
-        if any(k in q for k in search_keywords):
+        if self._SEARCH_KEYWORDS_RE.search(q):
             return 1
         if not q.strip():
             return 5
@@ -370,12 +637,17 @@ class RagAgent:
         self,
         *,
         db: AsyncSession,
+        user_id: int,
         selected_ids: Sequence[int] | None,
         scenario: int,
+        total_len: int | None = None,
     ) -> tuple[int, dict[str, Any]]:
         debug: dict[str, Any] = {}
         if scenario in {3, 4} and selected_ids:
-            docs, total_len = await self._load_documents(db, selected_ids)
+            if total_len is None:
+                total_len = await self._selected_documents_length(
+                    db, user_id, selected_ids
+                )
             debug["selected_docs"] = {
                 "ids": list(selected_ids),
                 "total_length": total_len,
@@ -385,43 +657,16 @@ class RagAgent:
             return 3, debug
         return scenario, debug
 
-    def _tools_for_scenario(self, scenario: int, intent: str | None) -> list[str]:
+    def _tools_for_scenario(self, scenario: int, intent: str | None) -> tuple[str, ...]:
         """
         Determine which tools the agent should have access to based on scenario and intent.
-        Returns empty list for scenarios that don't need tools (predefined responses).
+        Returns empty tuple for scenarios that don't need tools (predefined responses).
         """
-        if scenario == 1:
-            # Document search - only user documents
-            return ["search_user_documents"]
-
-        if scenario == 2:
-            # General request - depends on intent (corporate KB, CBR, news, etc.)
-            if intent == "small_talk" or intent == "off_topic":
-                # No tools needed - use predefined responses
-                return []
-            elif intent == "cbr_rate":
-                return ["fetch_cbr_data"]
-            elif intent == "finance_news":
-                return ["fetch_finance_news"]
-            elif intent == "knowledge_base":
-                return ["search_general_kb"]
-            elif intent == "hybrid_kb_docs":
-                # Multi-tool scenario: both knowledge base and user documents
-                return ["search_general_kb", "search_user_documents"]
-            else:
-                # Fallback: allow corporate knowledge base search
-                return ["search_general_kb"]
-
-        if scenario == 3:
-            # Full document context
-            return ["load_documents_full"]
-
-        if scenario == 4:
-            # Targeted search in selected documents
-            return ["search_user_documents"]
-
-        # Scenario 5 (clarification) or unknown
-        return []
+        table = self._TOOLS_BY_SCENARIO_INTENT
+        tools = table.get((scenario, intent))
+        if tools is None:
+            tools = table.get((scenario, None), ())
+        return tools
 
     async def _run_tool_conversation(
         self,
@@ -430,13 +675,14 @@ class RagAgent:
         query: str,
         history: list[dict[str, str]],
         instructions: str,
-        allowed_tools: list[str],
+        allowed_tools: Sequence[str],
         db: AsyncSession,
         user: User,
         selected_ids: Sequence[int] | None,
         intent: str | None,
         current_datetime: str,
         use_query_expansion: bool | None,
+        on_delta: DeltaCallback | None = None,
     ) -> tuple[str, list[VectorSearchResult], list[dict[str, Any]]]:
         messages = self._build_tool_messages(
             scenario=scenario,
@@ -447,7 +693,7 @@ class RagAgent:
             intent=intent,
             current_datetime=current_datetime,
         )
-        tool_specs = self._tool_registry.describe(allowed_tools)
+        tool_specs = self._describe_tools(allowed_tools)
         context = ToolContext(
             db=db,
             user=user,
@@ -468,12 +714,17 @@ class RagAgent:
         enable_parallel = getattr(settings, "RAG_ENABLE_PARALLEL_TOOLS", True)
 
         for iteration in range(max_iterations):
-            response = await self._chat.chat(
-                messages=messages,
-                tools=tool_specs,
-                tool_choice="auto",
-            )
-            message = response["choices"][0]["message"]
+            if on_delta is None:
+                response = await self._chat.chat(
+                    messages=messages,
+                    tools=tool_specs,
+                    tool_choice="auto",
+                )
+                message = response["choices"][0]["message"]
+            else:
+                message = await self._stream_tool_turn(
+                    messages=messages, tools=tool_specs, on_delta=on_delta
+                )
             role = message.get("role", "assistant")
             tool_calls = message.get("tool_calls") or []
             messages.append(
@@ -498,91 +749,86 @@ class RagAgent:
                         tool_calls
                     )
 
-                    try:
-                        results = await self._parallel_executor.execute_plan(
-                            executions, context
-                        )
-
-                        # Process results and add to messages
-                        for call in tool_calls:
-                            func = call.get("function", {})
-                            name = func.get("name")
-
-                            if name in results:
-                                result = results[name]
-                                collected_chunks.extend(result.used_chunks)
-
-                                # Find matching execution for timing
-                                exec_info = next(
-                                    (e for e in executions if e.tool_name == name), None
-                                )
-
-                                tool_debug.append(
-                                    {
-                                        "name": name,
-                                        "arguments": func.get("arguments"),
-                                        "returned_chunks": len(result.used_chunks),
-                                        "duration_ms": round(exec_info.duration_ms, 2)
-                                        if exec_info
-                                        else 0,
-                                        "parallel": True,
-                                    }
-                                )
-
-                                messages.append(
-                                    {
-                                        "role": "tool",
-                                        "tool_call_id": call.get("id"),
-                                        "name": name,
-                                        "content": json.dumps(
-                                            result.content,
-                                            ensure_ascii=False,
-                                            default=self._json_default,
-                                        ),
-                                    }
-                                )
-                            else:
-                                # Tool failed - add error message
-                                exec_info = next(
-                                    (e for e in executions if e.tool_name == name), None
-                                )
-                                error_msg = (
-                                    str(exec_info.error)
-                                    if exec_info and exec_info.error
-                                    else "Unknown error"
-                                )
+                    raw_arguments = {
+                        call.get("id"): (call.get("function") or {}).get("arguments")
+                        for call in tool_calls
+                    }
 
-                                tool_debug.append(
-                                    {
-                                        "name": name,
-                                        "arguments": func.get("arguments"),
-                                        "error": error_msg,
-                                        "parallel": True,
-                                    }
-                                )
+                    answered_ids: set[str | None] = set()
+                    try:
+                        # Tool messages are matched by tool_call_id, so each one is
+                        # appended as soon as its tool finishes. Closing the iterator
+                        # cancels and awaits unfinished tools before the sequential
+                        # fallback reuses the session.
+                        async with aclosing(
+                            self._parallel_executor.iter_completed(executions, context)
+                        ) as completed:
+                            async for execution in completed:
+                                name = execution.tool_name
+                                arguments = raw_arguments.get(execution.call_id)
+                                result = execution.result
+
+                                if result is not None:
+                                    collected_chunks.extend(result.used_chunks)
+                                    tool_debug.append(
+                                        {
+                                            "name": name,
+                                            "arguments": arguments,
+                                            "returned_chunks": len(result.used_chunks),
+                                            "duration_ms": round(
+                                                execution.duration_ms, 2
+                                            ),
+                                            "parallel": True,
+                                        }
+                                    )
+                                    content = result.content
+                                else:
+                                    # Tool failed - add error message
+                                    error_msg = (
+                                        str(execution.error)
+                                        if execution.error
+                                        else "Unknown error"
+                                    )
+                                    tool_debug.append(
+                                        {
+                                            "name": name,
+                                            "arguments": arguments,
+                                            "error": error_msg,
+                                            "parallel": True,
+                                        }
+                                    )
+                                    content = {"status": "error", "message": error_msg}
 
                                 messages.append(
                                     {
                                         "role": "tool",
-                                        "tool_call_id": call.get("id"),
+                                        "tool_call_id": execution.call_id,
                                         "name": name,
-                                        "content": json.dumps(
-                                            {"status": "error", "message": error_msg},
-                                            ensure_ascii=False,
-                                        ),
+                                        "content": self._encode_json(content),
                                     }
                                 )
+                                answered_ids.add(execution.call_id)
 
                     except Exception as exc:
                         logger.error("parallel-execution-failed", error=str(exc))
                         # Fallback to sequential execution
                         logger.info("falling-back-to-sequential")
                         enable_parallel = False  # Disable for rest of this conversation
-                        continue
+                        # every tool call needs a result before the next model turn
+                        sequential_calls = [
+                            call
+                            for call in tool_calls
+                            if call.get("id") not in answered_ids
+                        ]
+                    else:
+                        sequential_calls = []
 
                 else:
+                    sequential_calls = tool_calls
+
+                if sequential_calls:
                     # Sequential execution (original logic)
-                    for call in tool_calls:
+                    for call in sequential_calls:
                         function = call.get("function") or {}
                         name = function.get("name")
                         arguments = function.get("arguments")
@@ -607,11 +853,7 @@ class RagAgent:
                                     "role": "tool",
                                     "tool_call_id": call.get("id"),
                                     "name": name,
-                                    "content": json.dumps(
-                                        result.content,
-                                        ensure_ascii=False,
-                                        default=self._json_default,
-                                    ),
+                                    "content": self._encode_json(result.content),
                                 }
                             )
                         except Exception as exc:
@@ -624,9 +866,8 @@ class RagAgent:
                                     "role": "tool",
                                     "tool_call_id": call.get("id"),
                                     "name": name,
-                                    "content": json.dumps(
-                                        {"status": "error", "message": str(exc)},
-                                        ensure_ascii=False,
+                                    "content": self._encode_json(
+                                        {"status": "error", "message": str(exc)}
                                     ),
                                 }
                             )
@@ -638,15 +879,17 @@ class RagAgent:
 
         raise RuntimeError("tool loop exceeded maximum iterations")
 
+    @staticmethod
+    def _encode_json(obj: Any) -> str:
+        return orjson.dumps(
+            obj,
+            default=RagAgent._json_default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+        ).decode()
+
     @staticmethod
     def _json_default(obj: Any) -> Any:
-        if isinstance(obj, (datetime, date)):
-            return obj.isoformat()
-        if isinstance(obj, Decimal):
-            return float(obj)
-        if isinstance(obj, set):
-            return list(obj)
-        return str(obj)
+        return _JSON_DEFAULTS.get(type(obj), str)(obj)
 
     def _build_tool_messages(
         self,
@@ -663,17 +906,8 @@ class RagAgent:
         Build message list for tool-based conversation with token-aware optimization.
         Includes system prompt, guidance, history, and structured user request.
         """
-        from pathlib import Path
-
-        base = Path(__file__).with_suffix("").parent / "prompt_storage"
-        system_prompt = (base / "system_ru.txt").read_text(encoding="utf-8")
-
         # Adaptive guidance based on scenario and intent
-        guidance = self._build_guidance_message(
-            scenario=scenario,
-            intent=intent,
-            current_datetime=current_datetime,
-        )
+        guidance = self._build_guidance_message(intent=intent)
 
         # Build user request with clear structure
         user_payload = self._build_user_request(
@@ -685,17 +919,21 @@ class RagAgent:
             instructions=instructions,
         )
 
+        if intent in self._SELF_CONTAINED_INTENTS:
+            history = history[-self._SELF_CONTAINED_HISTORY_TAIL :]
+
         # Use token-aware context manager if enabled
         use_token_aware = getattr(settings, "RAG_USE_TOKEN_AWARE_CONTEXT", True)
 
         if use_token_aware:
             messages, stats = self._context_manager.build_optimal_context(
-                system_prompt=system_prompt,
+                system_prompt=self._system_prompt,
                 guidance=guidance,
                 history=history,
                 user_query=user_payload,
                 chunks=None,  # Chunks are added by tools, not at this stage
                 chunk_weight=0.4,  # More weight to history for tool conversations
+                max_history_tokens=self._config.tool_history_max_tokens,
             )
 
             logger.debug(
@@ -709,19 +947,91 @@ class RagAgent:
         else:
             # Fallback to original simple truncation
             messages = [
-                {"role": "system", "content": system_prompt},
+                {"role": "system", "content": self._system_prompt},
                 {"role": "system", "content": guidance},
             ]
-            messages.extend(history[-self._messages_limit :])
+            messages.extend(history)
             messages.append({"role": "user", "content": user_payload})
             return messages
 
-    def _build_guidance_message(
-        self, *, scenario: int, intent: str | None, current_datetime: str
-    ) -> str:
-        """Build scenario-specific guidance for the agent."""
+    async def _stream_tool_turn(
+        self,
+        *,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]],
+        on_delta: DeltaCallback,
+    ) -> dict[str, Any]:
+        """Run one tool-loop turn in streaming mode and rebuild the message.
+
+        The first non-blank delta decides the turn: if it is text, the model is
+        answering and every text delta is forwarded to ``on_delta``; if it is a
+        tool call, the turn is only accumulated. Text forwarded before a late
+        tool call (a preamble such as "Сейчас поищу…") is retracted with
+        ``STREAM_RESET``; the preamble stays in the turn's message content.
+        """
+        content_parts: list[str] = []
+        tool_calls: dict[int, dict[str, Any]] = {}
+        forwarding: bool | None = None
+
+        async for chunk in self._chat.chat_stream(
+            messages=messages, tools=tools, tool_choice="auto"
+        ):
+            choices = chunk.get("choices") or []
+            if not choices:
+                continue
+            delta = choices[0].get("delta") or {}
+
+            for call_delta in delta.get("tool_calls") or []:
+                if forwarding:
+                    on_delta(STREAM_RESET)
+                forwarding = False
+                call = tool_calls.setdefault(
+                    call_delta.get("index", len(tool_calls)),
+                    {
+                        "id": None,
+                        "type": "function",
+                        "function": {"name": "", "arguments": ""},
+                    },
+                )
+                if call_delta.get("id"):
+                    call["id"] = call_delta["id"]
+                function = call_delta.get("function") or {}
+                call["function"]["name"] += function.get("name") or ""
+                call["function"]["arguments"] += function.get("arguments") or ""
+
+            text = delta.get("content")
+            if not text:
+                continue
+            content_parts.append(text)
+            if forwarding is None and text.strip():
+                forwarding = True
+                on_delta("".join(content_parts))
+            elif forwarding:
+                on_delta(text)
+
+        return {
+            "role": "assistant",
+            "content": "".join(content_parts) or None,
+            "tool_calls": [tool_calls[index] for index in sorted(tool_calls)],
+        }
+
+    def _describe_tools(self, allowed_tools: Sequence[str]) -> list[dict[str, Any]]:
+        key = tuple(allowed_tools)
+        if (specs := self._tool_specs_cache.get(key)) is None:
+            specs = self._tool_registry.describe(allowed_tools)
+            self._tool_specs_cache[key] = specs
+        return specs
+
+    def _build_guidance_message(self, *, intent: str | None) -> str:
+        """Build intent-specific guidance for the agent.
+
+        The text is request-independent (the current time goes into the user
+        message), so the system prefix stays byte-identical and cacheable.
+        """
+        if (cached := self._guidance_cache.get(intent)) is not None:
+            return cached
+
         base_guidance = (
-            f"Текущая дата и время (UTC): {current_datetime}\n\n"
             "Ты — финансовый ассистент с доступом к инструментам поиска.\n"
             "Порядок работы:\n"
             "1. Вызови необходимые инструменты для сбора фактов\n"
@@ -743,7 +1053,8 @@ class RagAgent:
         if specific:
             base_guidance += f"{specific}\n\n"
 
-        base_guidance += f"Формат ответа:\n{self._answer_format_instructions()}"
+        base_guidance += f"Формат ответа:\n{self._ANSWER_FORMAT_INSTRUCTIONS}"
+        self._guidance_cache[intent] = base_guidance
         return base_guidance
 
     def _build_user_request(
@@ -770,7 +1081,7 @@ class RagAgent:
             f"Сценарий: {scenario} - {scenario_descriptions.get(scenario, 'Неизвестно')}",
             f"Тип запроса (intent): {intent or 'не определён'}",
             f"Выбранные документы: {list(selected_ids) if selected_ids else 'нет'}",
-            f"Текущая дата/время: {current_datetime}",
+            f"Текущая дата/время (UTC): {current_datetime}",
             "",
             "=== ВОПРОС ПОЛЬЗОВАТЕЛЯ ===",
             query,
@@ -781,12 +1092,27 @@ class RagAgent:
 
         return "\n".join(parts)
 
-    async def _load_documents(
-        self, db: AsyncSession, document_ids: Sequence[int]
-    ) -> tuple[list[ParsedDocument], int]:
-        docs = await ParsedDocumentRepository(db).get_many_by_ids(list(document_ids))
-        total_len = sum(len(d.content) for d in docs if d.content)
-        return list(docs), int(total_len)
+    async def _selected_documents_length(
+        self, db: AsyncSession, user_id: int, document_ids: Sequence[int]
+    ) -> int:
+        # parsed content does not change after upload, so a short TTL only
+        # bounds staleness after a document is deleted
+        cache_key = (user_id, tuple(sorted(document_ids)))
+        cached = self._documents_length_cache.get(cache_key)
+        if cached and cached.expires_at > time.time():
+            return cached.value
+
+        total_len = await ParsedDocumentRepository(db).get_total_content_length(
+            list(document_ids)
+        )
+        self._documents_length_cache.pop(cache_key, None)
+        self._documents_length_cache[cache_key] = CachedValue(
+            value=total_len,
+            expires_at=time.time() + self._DOCUMENTS_LENGTH_CACHE_TTL_SECONDS,
+        )
+        if len(self._documents_length_cache) > self._DOCUMENTS_LENGTH_CACHE_MAXSIZE:
+            self._documents_length_cache.pop(next(iter(self._documents_length_cache)))
+        return total_len
 
     async def _search_chunks(
         self,
@@ -799,13 +1125,27 @@ class RagAgent:
     ) -> list[VectorSearchResult]:
         from services.document_service import search_document_chunks
 
+        limit = limit or self._top_k
+        scope = (user.user_id, tuple(sorted(document_ids or ())), "chunks", limit)
+        embedding = await self._semantic_cache_embedding(query)
+        if embedding is not None:
+            cached = retrieval_cache.get(scope, embedding)
+            if cached is not None:
+                self._log_retrieval_event(
+                    stage="user_documents",
+                    duration_ms=0.0,
+                    result_count=len(cached),
+                    metadata={"document_ids": bool(document_ids), "cache": "hit"},
+                )
+                return list(cached)
+
         start = time.perf_counter()
         try:
             results = await search_document_chunks(
                 db=db,
                 user=user,
                 query=query,
-                limit=limit or self._top_k,
+                limit=limit,
                 score_threshold=self._score_threshold,
                 document_ids=document_ids,
             )
@@ -813,6 +1153,8 @@ class RagAgent:
             logger.error("vector-search-failed", reason=str(exc))
             raise VectorSearchError("Vector search is currently unavailable") from exc
         result_list = list(results)
+        if embedding is not None:
+            retrieval_cache.set(scope, embedding, tuple(result_list))
         duration_ms = (time.perf_counter() - start) * 1000
         self._log_retrieval_event(
             stage="user_documents",
@@ -822,6 +1164,17 @@ class RagAgent:
         )
         return result_list
 
+    async def _semantic_cache_embedding(self, query: str) -> np.ndarray | None:
+        """Query embedding for the retrieval cache; the search reuses it from the
+        embedding client's query cache, so probing costs no extra request."""
+        if not retrieval_cache.is_enabled or not self._kb_embeddings.is_enabled:
+            return None
+        try:
+            return await self._kb_embeddings.embed_query(query)
+        except Exception as exc:  # pragma: no cover - network/infra issues
+            logger.warning("semantic-cache-embedding-failed", reason=str(exc))
+            return None
+
     async def _search_with_expansion(
         self,
         *,
@@ -832,13 +1185,27 @@ class RagAgent:
         history: list[dict[str, str]],
         limit: int | None = None,
     ) -> tuple[list[VectorSearchResult], dict[str, Any]]:
-        from services.document_service import search_document_chunks
+        from services.document_service import search_document_chunks_batch
+
+        target_limit = limit or self._top_k
+        # a hit also skips the fusion-planner LLM call
+        scope = (
+            user.user_id,
+            tuple(sorted(document_ids or ())),
+            "expansion",
+            target_limit,
+        )
+        embedding = await self._semantic_cache_embedding(query)
+        if embedding is not None:
+            cached = retrieval_cache.get(scope, embedding)
+            if cached is not None:
+                fused, debug = cached
+                return list(fused), {**debug, "semantic_cache": "hit"}
 
         plan = await self._generate_fusion_plan(
             query=query, history=history, selected_ids=document_ids
         )
         expansions = plan.expansions
-        target_limit = limit or self._top_k
         if not expansions:
             plain = await self._search_chunks(
                 db=db,
@@ -855,19 +1222,17 @@ class RagAgent:
             }
 
         per_query = max(2, math.ceil(target_limit / len(expansions)))
-        results_by_query: list[list[VectorSearchResult]] = []
         start = time.perf_counter()
         try:
-            for q in expansions:
-                r = await search_document_chunks(
-                    db=db,
-                    user=user,
-                    query=q,
-                    limit=per_query,
-                    score_threshold=self._score_threshold,
-                    document_ids=document_ids,
-                )
-                results_by_query.append(list(r))
+            # all expansions go out as one embedding call and one Qdrant batch
+            results_by_query = await search_document_chunks_batch(
+                db=db,
+                user=user,
+                queries=expansions,
+                limit=per_query,
+                score_threshold=self._score_threshold,
+                document_ids=document_ids,
+            )
         except Exception as exc:  # pragma: no cover - network/infra issues
             logger.error("vector-search-expansion-failed", reason=str(exc))
             raise VectorSearchError(
@@ -896,6 +1261,8 @@ class RagAgent:
             "rerank": plan.rerank,
             "limit": target_limit,
         }
+        if embedding is not None:
+            retrieval_cache.set(scope, embedding, (tuple(fused), debug))
         return fused, debug
 
     async def _generate_fusion_plan(
@@ -928,16 +1295,7 @@ class RagAgent:
 
         if intent == "small_talk":
             # Check for greetings
-            greetings = {
-                "привет",
-                "здравствуй",
-                "добрый день",
-                "добрый вечер",
-                "доброе утро",
-                "hi",
-                "hello",
-            }
-            if any(greeting in query_lower for greeting in greetings):
+            if self._GREETING_RE.search(query_lower):
                 return (
                     "Здравствуйте! Я ваш финансовый ассистент. Могу помочь с анализом документов, "
                     "поиском информации в корпоративной базе знаний, актуальными данными по курсам валют "
@@ -945,14 +1303,7 @@ class RagAgent:
                 )
 
             # Check for identity/capabilities questions
-            identity_triggers = {
-                "кто ты",
-                "что ты",
-                "что ты умеешь",
-                "расскажи о себе",
-                "твои возможности",
-            }
-            if any(trigger in query_lower for trigger in identity_triggers):
+            if self._IDENTITY_RE.search(query_lower):
                 return (
                     "Я — финансовый ассистент вашей компании. Мои возможности:\n"
                     "• Анализ ваших документов и поиск нужной информации\n"
@@ -995,103 +1346,116 @@ class RagAgent:
         if not results:
             return []
 
-        deduped: list[dict[str, Any]] = []
-        seen_urls: set[str] = set()
+        russian: list[dict[str, Any]] = []
+        global_: list[dict[str, Any]] = []
+        seen_urls: set[tuple[str, str, str]] = set()
+        # results cluster on a few outlets; walk each host's labels only once
+        preferred_by_host: dict[str, bool] = {}
         for item in results:
             url = (item.get("url") or "").strip()
-            if not url or url in seen_urls:
+            if not url:
                 continue
-            seen_urls.add(url)
-            deduped.append(item)
+            key = self._canonical_url_key(url)
+            if key in seen_urls:
+                continue
+            seen_urls.add(key)
 
-        russian: list[dict[str, Any]] = []
-        global_: list[dict[str, Any]] = []
-        for item in deduped:
-            if self._is_russian_source(item):
+            host = self._extract_host(url)
+            preferred = preferred_by_host.get(host)
+            if preferred is None:
+                preferred = preferred_by_host[host] = self._is_preferred_host(host)
+            if preferred or self._has_cyrillic_text(item):
                 russian.append(item)
             else:
                 global_.append(item)
         return russian + global_
 
-    def _is_russian_source(self, item: dict[str, Any]) -> bool:
-        url = (item.get("url") or "").strip()
-        hostname = ""
-        if url:
-            try:
-                hostname = urlparse(url).hostname or ""
-            except ValueError:
-                hostname = ""
-        hostname = hostname.lower()
-        if any(hostname.endswith(domain) for domain in self._preferred_news_domains):
-            return True
-
-        snippet = (
-            f"{item.get('title', '')} {item.get('content', '')}".lower()
+    @staticmethod
+    def _canonical_url_key(url: str) -> tuple[str, str, str]:
+        """Dedup key ignoring scheme, "www.", trailing slash, fragment and utm_*."""
+        parts = urlsplit(url)
+        query = "&".join(
+            param
+            for param in parts.query.split("&")
+            if param and not param.startswith("utm_")
         )
-        return any("а" <= ch <= "я" or ch == "ё" for ch in snippet)
-
-    def _answer_format_instructions(self) -> str:
-        """
-        Return adaptive format instructions based on query complexity.
-        These are general instructions - specific formatting is in system prompt.
-        """
         return (
-            "Адаптируй формат ответа под сложность вопроса:\n"
-            "- Простой вопрос: краткий прямой ответ (1-3 абзаца).\n"
-            "- Средней сложности: структура с разделами 'Ответ' и 'Источники'.\n"
-            "- Сложный вопрос: полная структура с 'Краткий вывод', 'Подробный анализ', 'Источники'.\n"
-            "\nИсточники указывай строго в формате:\n"
-            "- [Название файла](URL) — для документов пользователя\n"
-            "- [Финансовая база знаний] — для корпоративной БЗ\n"
-            "- [cbr.ru] — для данных ЦБ РФ\n"
-            "- [Название статьи](URL) — для веб-поиска\n"
-            "\nНЕ используй технические термины типа 'Tavily API', 'чанк', 'векторный поиск'."
+            parts.netloc.lower().removeprefix("www."),
+            parts.path.rstrip("/") or "/",
+            query,
         )
 
+    def _has_cyrillic_text(self, item: dict[str, Any]) -> bool:
+        # title first: it usually settles the question without scanning content
+        return any(
+            self._CYRILLIC_RE.search(item.get(field) or "") is not None
+            for field in ("title", "content")
+        )
+
+    def _is_preferred_host(self, host: str) -> bool:
+        """Match the host and each parent domain against the preferred set,
+        so "www.cbr.ru" matches "cbr.ru" but "notcbr.ru" does not."""
+        while host:
+            if host in self._preferred_news_domains:
+                return True
+            dot = host.find(".")
+            if dot < 0:
+                return False
+            host = host[dot + 1 :]
+        return False
+
+    @staticmethod
+    def _extract_host(url: str) -> str:
+        # only the netloc is needed, so skip a full urlparse
+        scheme_end = url.find("://")
+        start = scheme_end + 3 if scheme_end >= 0 else 0
+        end = len(url)
+        for sep in "/?#":
+            pos = url.find(sep, start)
+            if 0 <= pos < end:
+                end = pos
+        host = url[start:end].rpartition("@")[2].partition(":")[0]
+        return host.lower().rstrip(".")
+
     def _rrf_merge(
         self, *, results_by_query: list[list[VectorSearchResult]], k: int, limit: int
     ) -> list[VectorSearchResult]:
         # Reciprocal Rank Fusion across multiple query result lists
-        rank_maps: list[dict[int, int]] = []
-        for lst in results_by_query:
-            rank_map: dict[int, int] = {}
-            for idx, res in enumerate(lst):
-                rank_map[res.chunk.chunk_id] = idx + 1  # ranks start at 1
-            rank_maps.append(rank_map)
-
-        fused_scores: dict[int, float] = {}
+        lists = [lst for lst in results_by_query if lst]
+        if not lists or limit <= 0:
+            return []
+
+        chunk_ids = np.fromiter(
+            (res.chunk.chunk_id for lst in lists for res in lst), dtype=np.int64
+        )
+        ranks = np.concatenate(
+            [np.arange(1, len(lst) + 1, dtype=np.int64) for lst in lists]
+        )
+        unique_ids, first_seen, inverse = np.unique(
+            chunk_ids, return_index=True, return_inverse=True
+        )
+        # sum 1/(k+rank) over every list the chunk appears in
+        fused = np.zeros(unique_ids.size)
+        np.add.at(fused, inverse, 1.0 / (k + ranks))
+
+        # keep the best scoring instance to carry payload and text
         best_result_for_chunk: dict[int, VectorSearchResult] = {}
-        for lst in results_by_query:
-            for idx, res in enumerate(lst):
-                cid = res.chunk.chunk_id
-                # use min rank across lists where chunk appears; sum 1/(k+rank) per list
-                score_sum = fused_scores.get(cid, 0.0)
-                rank = idx + 1
-                score_sum += 1.0 / (k + rank)
-                fused_scores[cid] = score_sum
-                # keep the best scoring instance to carry payload and text
-                if (
-                    cid not in best_result_for_chunk
-                    or res.score > best_result_for_chunk[cid].score
-                ):
-                    best_result_for_chunk[cid] = res
-
-        fused = [
-            (cid, score, best_result_for_chunk[cid])
-            for cid, score in fused_scores.items()
-        ]
-        fused.sort(key=lambda x: x[1], reverse=True)
-        top_results: list[VectorSearchResult] = []
-        for _, _, res in fused[:limit]:
-            top_results.append(res)
-        return top_results
+        for lst in lists:
+            for res in lst:
+                best = best_result_for_chunk.get(res.chunk.chunk_id)
+                if best is None or res.score > best.score:
+                    best_result_for_chunk[res.chunk.chunk_id] = res
+
+        # ties keep first-appearance order, as the previous stable sort did
+        order = np.lexsort((first_seen, -fused))[:limit]
+        return [best_result_for_chunk[int(unique_ids[i])] for i in order]
 
     def _resolve_instructions(self, custom_value: str | None) -> str:
         if custom_value:
             stripped = custom_value.strip()
             if stripped:
                 return stripped
-        return self._answer_format_instructions()
+        return self._ANSWER_FORMAT_INSTRUCTIONS
 
     async def _answer_with_full_context(
         self,
@@ -1101,12 +1465,14 @@ class RagAgent:
         documents: Sequence[ParsedDocument],
         instructions: str,
     ) -> str:
-        from pathlib import Path
-
-        base = Path(__file__).with_suffix("").parent / "prompt_storage"
-        system_prompt = (base / "system_ru.txt").read_text(encoding="utf-8")
-
-        context_parts: list[str] = []
+        # documents can be megabytes each: collect flat fragments and copy them
+        # into the prompt with a single join
+        parts: list[str] = [
+            f"Вопрос клиента: {query}\n\n"
+            f"Инструкции по ответу:\n{instructions}\n\n"
+            "Ниже приведён контекст выбранных документов в формате Markdown. Используй его для ссылок и цитирования."
+            "\n\n"
+        ]
         for idx, d in enumerate(documents, start=1):
             name = d.filename or f"Документ {d.document_id}"
             url = d.minio_url or "н/д"
@@ -1117,26 +1483,22 @@ class RagAgent:
             link_display = (
                 f"[Открыть документ]({url})" if url != "н/д" else "ссылка недоступна"
             )
-            snippet = (
+            if idx > 1:
+                parts.append("\n\n---\n\n")
+            parts.append(
                 f"### Документ {idx}: {name} (ID {d.document_id})\n"
                 f"- Ссылка: {link_display}\n"
                 f"- Дата загрузки: {created}\n"
                 f"- Объём: {len(content)} символов\n\n"
-                f"```markdown\n{content}\n```"
+                "```markdown\n"
             )
-            context_parts.append(snippet)
-        context = "\n\n---\n\n".join(context_parts)
-
-        user_content = (
-            f"Вопрос клиента: {query}\n\n"
-            f"Инструкции по ответу:\n{instructions}\n\n"
-            "Ниже приведён контекст выбранных документов в формате Markdown. Используй его для ссылок и цитирования."
-            f"\n\n{context}"
-        )
+            parts.append(content)
+            parts.append("\n```")
+        user_content = "".join(parts)
 
         messages = [
-            {"role": "system", "content": system_prompt},
-            *history[-self._messages_limit :],
+            {"role": "system", "content": self._system_prompt},
+            *history,
             {"role": "user", "content": user_content},
         ]
         prompt_params = self._config.prompts.full_context_answer
@@ -1154,12 +1516,12 @@ class RagAgent:
         chunks: Sequence[VectorSearchResult],
         instructions: str,
     ) -> str:
-        from pathlib import Path
-
-        base = Path(__file__).with_suffix("").parent / "prompt_storage"
-        system_prompt = (base / "system_ru.txt").read_text(encoding="utf-8")
-
-        snippets: list[str] = []
+        parts: list[str] = [
+            f"Вопрос клиента: {query}\n\n"
+            f"Инструкции по ответу:\n{instructions}\n\n"
+            "Ниже приведены релевантные фрагменты документов с метаданными. Используй их и укажи ссылки на источники в формате [[Источник: …]]."
+            "\n\n"
+        ]
         for idx, r in enumerate(chunks, start=1):
             payload = r.payload or {}
             title = (
@@ -1173,30 +1535,25 @@ class RagAgent:
                 or (payload.get("document_metadata") or {}).get("minio_url")
                 or "н/д"
             )
-            snippet_text = r.chunk.chunk_content.strip()
             link_display = (
                 f"[{title}]({url})" if url != "н/д" else f"{title} (ссылка недоступна)"
             )
-            snippet_block = (
+            if idx > 1:
+                parts.append("\n\n---\n\n")
+            parts.append(
                 f"### Источник {idx}: {title} (Документ {doc_id}, чанк {serial})"
                 f"\n- Ссылка: {link_display}"
                 f"\n- Оценка сходства: {r.score:.3f}"
                 f"\n- Чанк: {serial}"
-                f"\n\n```markdown\n{snippet_text}\n```"
+                "\n\n```markdown\n"
             )
-            snippets.append(snippet_block)
-        context = "\n\n---\n\n".join(snippets)
-
-        user_content = (
-            f"Вопрос клиента: {query}\n\n"
-            f"Инструкции по ответу:\n{instructions}\n\n"
-            "Ниже приведены релевантные фрагменты документов с метаданными. Используй их и укажи ссылки на источники в формате [[Источник: …]]."
-            f"\n\n{context}"
-        )
+            parts.append(r.chunk.chunk_content.strip())
+            parts.append("\n```")
+        user_content = "".join(parts)
 
         messages = [
-            {"role": "system", "content": system_prompt},
-            *history[-self._messages_limit :],
+            {"role": "system", "content": self._system_prompt},
+            *history,
             {"role": "user", "content": user_content},
         ]
         prompt_params = self._config.prompts.chunk_answer
@@ -1206,12 +1563,6 @@ class RagAgent:
         )
         return resp["choices"][0]["message"]["content"]
 
-    def _vector_search_unavailable_message(self) -> str:
-        return (
-            "Не удалось подключиться к базе векторного поиска документов. "
-            "Пожалуйста, повторите запрос чуть позже или сообщите администратору, если проблема сохраняется."
-        )
-
     async def _answer_general(
         self,
         *,
@@ -1219,11 +1570,6 @@ class RagAgent:
         history: list[dict[str, str]],
         instructions: str,
     ) -> str:
-        from pathlib import Path
-
-        base = Path(__file__).with_suffix("").parent / "prompt_storage"
-        system_prompt = (base / "system_ru.txt").read_text(encoding="utf-8")
-
         user_content = (
             f"Вопрос клиента: {query}\n\n"
             f"Инструкции по ответу:\n{instructions}\n\n"
@@ -1231,8 +1577,8 @@ class RagAgent:
         )
 
         messages = [
-            {"role": "system", "content": system_prompt},
-            *history[-self._messages_limit :],
+            {"role": "system", "content": self._system_prompt},
+            *history,
             {"role": "user", "content": user_content},
         ]
         prompt_params = self._config.prompts.general_answer
@@ -1248,12 +1594,8 @@ class RagAgent:
         query: str,
         history: list[dict[str, str]],
         clarifications: Sequence[str] | None = None,
+        on_delta: DeltaCallback | None = None,
     ) -> str:
-        from pathlib import Path
-
-        base = Path(__file__).with_suffix("").parent / "prompt_storage"
-        system_prompt = (base / "system_ru.txt").read_text(encoding="utf-8")
-
         extra = ""
         if clarifications:
             bullets = "\n".join(f"- {c}" for c in clarifications)
@@ -1268,17 +1610,40 @@ class RagAgent:
         user_content = f"{query}\n\n{extra}{prompt_text}"
 
         messages = [
-            {"role": "system", "content": system_prompt},
-            *history[-self._messages_limit :],
+            {"role": "system", "content": self._system_prompt},
+            *history,
             {"role": "user", "content": user_content},
         ]
         prompt_params = self._config.prompts.clarification
+        if on_delta is not None:
+            return await self._stream_text(
+                messages=messages, prompt_params=prompt_params, on_delta=on_delta
+            )
         resp = await self._chat.chat(
             messages=messages,
             **self._prompt_kwargs(prompt_params),
         )
         return resp["choices"][0]["message"]["content"]
 
+    async def _stream_text(
+        self,
+        *,
+        messages: list[dict[str, Any]],
+        prompt_params: PromptParams,
+        on_delta: DeltaCallback,
+    ) -> str:
+        """Stream a plain (tool-less) completion to ``on_delta``; return the text."""
+        content_parts: list[str] = []
+        async for chunk in self._chat.chat_stream(
+            messages=messages, **self._prompt_kwargs(prompt_params)
+        ):
+            choices = chunk.get("choices") or []
+            text = (choices[0].get("delta") or {}).get("content") if choices else None
+            if text:
+                content_parts.append(text)
+                on_delta(text)
+        return "".join(content_parts)
+
     def _prompt_kwargs(self, params: PromptParams) -> dict[str, Any]:
         return {
             "temperature": params.temperature,
@@ -1297,13 +1662,12 @@ class RagAgent:
 
         try:
             start = time.perf_counter()
-            embeddings = await self._kb_embeddings.embed_texts([query])
+            query_embedding = await self._kb_embeddings.embed_query(query)
         except Exception as exc:  # pragma: no cover
             logger.warning("kb-embedding-failed", reason=str(exc))
             return []
 
-        if not embeddings:
-            return []
+        from qdrant_client.http.models import FieldCondition, MatchValue
 
         filter_conditions = [
             FieldCondition(
@@ -1315,7 +1679,7 @@ class RagAgent:
         try:
             points = await self._kb_store.search_document_embeddings(
                 user_id=kb_settings.user_id,
-                query_embedding=embeddings[0],
+                query_embedding=query_embedding,
                 limit=limit or kb_settings.limit,
                 score_threshold=kb_settings.score_threshold,
                 extra_filter_conditions=filter_conditions,
@@ -1473,27 +1837,24 @@ class RagAgent:
             document_ids = context.selected_document_ids
         if not document_ids:
             raise ValueError("document_ids are required for load_documents_full")
-        documents, total_len = await self._load_documents(context.db, document_ids)
         max_chars = invocation.arguments.get("max_chars")
         max_chars = (
             int(max_chars) if isinstance(max_chars, int) else self._max_context_chars
         )
-        trimmed_docs: list[dict[str, Any]] = []
-        remaining = max_chars
-        for doc in documents:
-            content = (doc.content or "")[: max(0, remaining)]
-            remaining = max(0, remaining - len(content))
-            trimmed_docs.append(
-                {
-                    "document_id": doc.document_id,
-                    "filename": doc.filename,
-                    "url": doc.minio_url,
-                    "content": content,
-                    "created_at": getattr(doc, "created_at", None),
-                }
-            )
-            if remaining <= 0:
-                break
+        # only the budgeted prefixes leave Postgres, not the full bodies
+        documents, total_len = await ParsedDocumentRepository(
+            context.db
+        ).get_content_prefixes(list(document_ids), max_chars)
+        trimmed_docs = [
+            {
+                "document_id": doc["document_id"],
+                "filename": doc["filename"],
+                "url": doc["minio_url"],
+                "content": doc["content"],
+                "created_at": doc["created_at"],
+            }
+            for doc in documents
+        ]
         return ToolResult(
             content={
                 "status": "ok",
@@ -44,6 +44,7 @@ class RagAgentSettings:
     prompts: RagPromptSettings
     knowledge_base: KnowledgeBaseSettings
     tool_history_tail: int
+    tool_history_max_tokens: int
 
 
 def load_rag_agent_settings() -> RagAgentSettings:
@@ -102,6 +103,7 @@ def load_rag_agent_settings() -> RagAgentSettings:
         prompts=prompts,
         knowledge_base=knowledge_base,
         tool_history_tail=int(settings.RAG_TOOL_HISTORY_TAIL),
+        tool_history_max_tokens=int(settings.RAG_TOOL_HISTORY_MAX_TOKENS),
     )
 
 
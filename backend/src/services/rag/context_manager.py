@@ -106,8 +106,9 @@ class TokenAwareContextManager:
             msg_tokens = self.estimate_tokens(msg.get("content", "")) + 4
             if current_tokens + msg_tokens > available:
                 break
-            result.insert(0, msg)
+            result.append(msg)
             current_tokens += msg_tokens
+        result.reverse()
 
         logger.info(
             "messages-truncated",
@@ -177,6 +178,7 @@ class TokenAwareContextManager:
         user_query: str,
         chunks: list[VectorSearchResult] | None = None,
         chunk_weight: float = 0.6,  # 60% of budget for chunks
+        max_history_tokens: int | None = None,
     ) -> tuple[list[dict], dict[str, Any]]:
         """
         Build context that fits within token budget.
@@ -197,6 +199,9 @@ class TokenAwareContextManager:
         # Allocate budget (configurable weights)
         chunk_budget = int(remaining * chunk_weight)
         history_budget = int(remaining * (1.0 - chunk_weight))
+        if max_history_tokens is not None:
+            # older turns are the lowest priority; truncation keeps the newest first
+            history_budget = min(history_budget, max_history_tokens)
 
         stats = {
             "total_budget": self._available,
@@ -222,10 +227,7 @@ class TokenAwareContextManager:
             # If chunks exceed budget, drop lowest scoring
             while chunks_tokens > chunk_budget and len(optimized_chunks) > 3:
                 dropped = optimized_chunks.pop()  # Remove last (lowest score)
-                chunks_tokens = sum(
-                    self.estimate_tokens(c.chunk.chunk_content) + 20
-                    for c in optimized_chunks
-                )
+                chunks_tokens -= self.estimate_tokens(dropped.chunk.chunk_content) + 20
                 logger.debug(
                     "chunk-dropped-budget",
                     chunk_id=dropped.chunk.chunk_id,
@@ -1,10 +1,16 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import json
-from dataclasses import dataclass
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
 from pathlib import Path
 from typing import Any, Sequence
 
+import orjson
+
 from services.rag.configuration import PromptParams
 from services.rag.openrouter_chat import OpenRouterChatClient
 
@@ -34,6 +40,8 @@ class FusionPlanner:
         chat_client: OpenRouterChatClient,
         prompt_params: PromptParams,
         history_tail: int = 5,
+        cache_ttl_seconds: int = 900,
+        cache_maxsize: int = 2048,
     ) -> None:
         self._chat_client = chat_client
         self._prompt_params = prompt_params
@@ -41,6 +49,11 @@ class FusionPlanner:
         base = Path(__file__).with_suffix("").parent / "prompt_storage"
         self._system_prompt = (base / "system_ru.txt").read_text(encoding="utf-8")
         self._fusion_prompt = (base / "fusion_ru.txt").read_text(encoding="utf-8")
+        self._cache_ttl_seconds = cache_ttl_seconds
+        self._cache_maxsize = cache_maxsize
+        self._cache: OrderedDict[bytes, tuple[FusionPlan, float]] = OrderedDict()
+        # concurrent identical requests share one planner call
+        self._in_flight: dict[bytes, asyncio.Task[FusionPlan]] = {}
 
     async def plan(
         self,
@@ -50,6 +63,49 @@ class FusionPlanner:
         selected_ids: Sequence[int] | None = None,
     ) -> FusionPlan:
         history_tail = (history or [])[-self._history_tail :]
+        # the plan only depends on what the prompt shows: query, history tail, ids
+        key = hashlib.blake2b(
+            orjson.dumps(
+                [
+                    " ".join(query.lower().split()),
+                    [[m.get("role"), m.get("content")] for m in history_tail],
+                    sorted(selected_ids or []),
+                ]
+            ),
+            digest_size=16,
+        ).digest()
+
+        if (cached := self._cache.get(key)) is not None:
+            plan, expires_at = cached
+            if expires_at > time.monotonic():
+                self._cache.move_to_end(key)
+                return replace(plan, base_query=query)
+            self._cache.pop(key, None)
+
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(
+                self._plan_and_cache(
+                    key,
+                    query=query,
+                    history_tail=history_tail,
+                    selected_ids=selected_ids,
+                )
+            )
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # shielded so one cancelled caller does not cancel the others' shared call
+        plan = await asyncio.shield(task)
+        return replace(plan, base_query=query)
+
+    async def _plan_and_cache(
+        self,
+        key: bytes,
+        *,
+        query: str,
+        history_tail: Sequence[dict[str, str]],
+        selected_ids: Sequence[int] | None,
+    ) -> FusionPlan:
         payload = {
             "query": query,
             "history_messages": len(history_tail),
@@ -76,7 +132,7 @@ class FusionPlanner:
         notes = str(data.get("notes") or data.get("strategy") or "").strip()
         rerank = bool(data.get("rerank", True))
         direct_hint = str(data.get("direct_answer_hint", "")).strip() or None
-        return FusionPlan(
+        plan = FusionPlan(
             base_query=query,
             refinements=refinements,
             subqueries=subqueries,
@@ -84,6 +140,12 @@ class FusionPlanner:
             rerank=rerank,
             direct_answer_hint=direct_hint,
         )
+        # an unparseable reply yields an empty plan; retry it next time
+        if data:
+            self._cache[key] = (plan, time.monotonic() + self._cache_ttl_seconds)
+            if len(self._cache) > self._cache_maxsize:
+                self._cache.popitem(last=False)
+        return plan
 
     def _prompt_kwargs(self) -> dict[str, Any]:
         return {
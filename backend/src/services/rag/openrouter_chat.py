@@ -1,8 +1,9 @@
 from __future__ import annotations
 
-from typing import Any, Literal
+from typing import Any, AsyncIterator, Literal
 
 import httpx
+import orjson
 
 from config import settings
 
@@ -10,6 +11,28 @@ from config import settings
 Role = Literal["system", "user", "assistant", "tool"]
 
 
+def _with_cache_breakpoint(messages: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Mark the end of the leading system messages as a prompt-cache breakpoint."""
+    prefix_end = 0
+    while prefix_end < len(messages) and messages[prefix_end].get("role") == "system":
+        prefix_end += 1
+    if not prefix_end:
+        return messages
+
+    last_system = messages[prefix_end - 1]
+    content = last_system.get("content")
+    if not isinstance(content, str):
+        return messages
+
+    marked = {
+        **last_system,
+        "content": [
+            {"type": "text", "text": content, "cache_control": {"type": "ephemeral"}}
+        ],
+    }
+    return [*messages[: prefix_end - 1], marked, *messages[prefix_end:]]
+
+
 class OpenRouterChatClient:
     DEFAULT_BASE_URL = "https://openrouter.ai/api/v1/chat/completions"
 
@@ -25,6 +48,7 @@ class OpenRouterChatClient:
         default_temperature: float | None = None,
         default_top_p: float | None = None,
         default_max_tokens: int | None = None,
+        cache_system_prompt: bool = False,
     ) -> None:
         self._api_key = api_key
         self._model = model
@@ -35,6 +59,7 @@ class OpenRouterChatClient:
         self._default_temperature = default_temperature
         self._default_top_p = default_top_p
         self._default_max_tokens = default_max_tokens
+        self._cache_system_prompt = cache_system_prompt
 
     @classmethod
     def from_settings(cls) -> "OpenRouterChatClient":
@@ -56,6 +81,9 @@ class OpenRouterChatClient:
             default_max_tokens=getattr(
                 settings, "OPENROUTER_CHAT_DEFAULT_MAX_TOKENS", None
             ),
+            cache_system_prompt=bool(
+                getattr(settings, "OPENROUTER_CHAT_CACHE_SYSTEM_PROMPT", False)
+            ),
         )
 
     async def chat(
@@ -71,6 +99,79 @@ class OpenRouterChatClient:
         presence_penalty: float | None = None,
         response_format: dict[str, Any] | None = None,
     ) -> dict[str, Any]:
+        payload = self._build_payload(
+            messages=messages,
+            tools=tools,
+            tool_choice=tool_choice,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            top_p=top_p,
+            frequency_penalty=frequency_penalty,
+            presence_penalty=presence_penalty,
+            response_format=response_format,
+        )
+
+        async with httpx.AsyncClient(timeout=self._timeout_seconds) as client:
+            response = await client.post(
+                self._base_url, json=payload, headers=self._headers()
+            )
+        response.raise_for_status()
+        return response.json()
+
+    async def chat_stream(
+        self,
+        *,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None = None,
+        tool_choice: str | dict[str, Any] | None = None,
+        temperature: float | None = None,
+        max_tokens: int | None = None,
+        top_p: float | None = None,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Yield completion chunks (``choices[0].delta``) as the model emits them."""
+        payload = self._build_payload(
+            messages=messages,
+            tools=tools,
+            tool_choice=tool_choice,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            top_p=top_p,
+        )
+        payload["stream"] = True
+
+        async with httpx.AsyncClient(timeout=self._timeout_seconds) as client:
+            async with client.stream(
+                "POST", self._base_url, json=payload, headers=self._headers()
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    # SSE comments (": OPENROUTER PROCESSING") keep the connection alive
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    chunk = orjson.loads(data)
+                    if error := chunk.get("error"):
+                        raise RuntimeError(f"OpenRouter stream error: {error}")
+                    yield chunk
+
+    def _build_payload(
+        self,
+        *,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None = None,
+        tool_choice: str | dict[str, Any] | None = None,
+        temperature: float | None = None,
+        max_tokens: int | None = None,
+        top_p: float | None = None,
+        frequency_penalty: float | None = None,
+        presence_penalty: float | None = None,
+        response_format: dict[str, Any] | None = None,
+    ) -> dict[str, Any]:
+        if self._cache_system_prompt:
+            messages = _with_cache_breakpoint(messages)
+
         payload: dict[str, Any] = {
             "model": self._model,
             "messages": messages,
@@ -97,7 +198,9 @@ class OpenRouterChatClient:
             payload["presence_penalty"] = presence_penalty
         if response_format is not None:
             payload["response_format"] = response_format
+        return payload
 
+    def _headers(self) -> dict[str, str]:
         headers = {
             "Authorization": f"Bearer {self._api_key}",
             "Content-Type": "application/json",
@@ -106,8 +209,4 @@ class OpenRouterChatClient:
             headers["HTTP-Referer"] = self._referer
         if self._title:
             headers["X-Title"] = self._title
-
-        async with httpx.AsyncClient(timeout=self._timeout_seconds) as client:
-            response = await client.post(self._base_url, json=payload, headers=headers)
-        response.raise_for_status()
-        return response.json()
+        return headers
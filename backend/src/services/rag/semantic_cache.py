@@ -0,0 +1,147 @@
+"""In-process semantic cache for retrieval results."""
+
+from __future__ import annotations
+
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Hashable
+
+import numpy as np
+
+from config import settings
+
+
+@dataclass
+class _ScopeEntries:
+    embeddings: np.ndarray
+    values: list[Any] = field(default_factory=list)
+    expires_at: list[float] = field(default_factory=list)
+
+
+class SemanticCache:
+    """Cache values by query embedding, hitting on cosine similarity >= threshold.
+
+    Entries live in scopes (e.g. user id + selected documents), so a lookup only
+    compares against queries made under the same access rights. Embeddings are
+    expected to be L2-normalized, which makes the similarity a dot product.
+    """
+
+    def __init__(
+        self,
+        *,
+        threshold: float | None,
+        ttl_seconds: int = 300,
+        max_entries_per_scope: int = 64,
+        max_scopes: int = 1024,
+    ) -> None:
+        self._threshold = threshold
+        self._ttl_seconds = ttl_seconds
+        self._max_entries = max(1, max_entries_per_scope)
+        self._max_scopes = max(1, max_scopes)
+        self._scopes: OrderedDict[Hashable, _ScopeEntries] = OrderedDict()
+
+    @classmethod
+    def from_settings(cls) -> "SemanticCache":
+        return cls(
+            threshold=getattr(settings, "RAG_SEMANTIC_CACHE_THRESHOLD", None),
+            ttl_seconds=int(getattr(settings, "RAG_SEMANTIC_CACHE_TTL_SECONDS", 300)),
+            max_entries_per_scope=int(
+                getattr(settings, "RAG_SEMANTIC_CACHE_MAX_ENTRIES", 64)
+            ),
+        )
+
+    @property
+    def is_enabled(self) -> bool:
+        return self._threshold is not None
+
+    def get(self, scope: Hashable, embedding: np.ndarray) -> Any | None:
+        if not self.is_enabled or (entries := self._scopes.get(scope)) is None:
+            return None
+
+        self._drop_expired(scope, entries)
+        if not entries.values:
+            return None
+
+        similarities = entries.embeddings @ embedding
+        best = int(np.argmax(similarities))
+        if similarities[best] < self._threshold:
+            return None
+        self._scopes.move_to_end(scope)
+        return entries.values[best]
+
+    def set(self, scope: Hashable, embedding: np.ndarray, value: Any) -> None:
+        if not self.is_enabled:
+            return
+
+        entries = self._scopes.get(scope)
+        if entries is None:
+            entries = _ScopeEntries(
+                embeddings=np.empty((0, len(embedding)), np.float32)
+            )
+            self._scopes[scope] = entries
+            if len(self._scopes) > self._max_scopes:
+                self._scopes.popitem(last=False)
+        self._scopes.move_to_end(scope)
+
+        # entries are kept oldest first, so overflow trims from the front
+        entries.embeddings = np.vstack([entries.embeddings, embedding])[
+            -self._max_entries :
+        ]
+        entries.values.append(value)
+        entries.expires_at.append(time.monotonic() + self._ttl_seconds)
+        if len(entries.values) > self._max_entries:
+            del entries.values[0]
+            del entries.expires_at[0]
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> None:
+        """Drop every scope for which ``predicate(scope)`` is true."""
+        for scope in [scope for scope in self._scopes if predicate(scope)]:
+            del self._scopes[scope]
+
+    def _drop_expired(self, scope: Hashable, entries: _ScopeEntries) -> None:
+        now = time.monotonic()
+        # expiry times grow with insertion order, so expired entries form a prefix
+        expired = next(
+            (i for i, expires_at in enumerate(entries.expires_at) if expires_at > now),
+            len(entries.expires_at),
+        )
+        if not expired:
+            return
+        entries.embeddings = entries.embeddings[expired:]
+        entries.values = entries.values[expired:]
+        entries.expires_at = entries.expires_at[expired:]
+        if not entries.values:
+            del self._scopes[scope]
+
+
+# shared by the agent (lookups) and document upload/deletion (invalidation)
+retrieval_cache = SemanticCache.from_settings()
+
+# other per-user caches built from documents (e.g. the agent's answers); weak
+# so a listener does not keep its owner alive
+_document_change_listeners: list[weakref.WeakMethod] = []
+
+
+def on_user_documents_changed(listener: Callable[[int], None]) -> None:
+    """Call the bound method ``listener(user_id)`` when a user's documents change."""
+    _document_change_listeners.append(weakref.WeakMethod(listener))
+
+
+def invalidate_user_retrieval_cache(user_id: int) -> None:
+    """Forget cached retrieval results after a user's documents change."""
+    retrieval_cache.invalidate(lambda scope: scope[0] == user_id)
+    for ref in list(_document_change_listeners):
+        if (listener := ref()) is None:
+            _document_change_listeners.remove(ref)
+        else:
+            listener(user_id)
+
+
+__all__ = [
+    "SemanticCache",
+    "invalidate_user_retrieval_cache",
+    "on_user_documents_changed",
+    "retrieval_cache",
+]
@@ -5,7 +5,7 @@ from __future__ import annotations
 import asyncio
 import time
 from dataclasses import dataclass, field
-from typing import Any
+from typing import Any, AsyncIterator
 
 import structlog
 
@@ -21,6 +21,7 @@ class ToolExecution:
     tool_name: str
     arguments: dict[str, Any]
     depends_on: list[str] = field(default_factory=list)
+    call_id: str | None = None
     result: ToolResult | None = None
     error: Exception | None = None
     duration_ms: float = 0.0
@@ -43,76 +44,91 @@ class ParallelToolExecutor:
         Independent tools run in parallel.
         Returns dict of tool_name -> ToolResult.
         """
-        if not executions:
-            return {}
-
         results: dict[str, ToolResult] = {}
-        completed: set[str] = set()
-        pending = {ex.tool_name: ex for ex in executions}
-
-        while pending:
-            # Find tools ready to execute (dependencies met)
-            ready = [
-                ex
-                for ex in pending.values()
-                if all(dep in completed for dep in ex.depends_on)
-            ]
-
-            if not ready:
-                # Check for circular dependency
-                remaining = list(pending.keys())
-                logger.error(
-                    "circular-dependency-detected",
-                    remaining_tools=remaining,
-                    dependencies={name: ex.depends_on for name, ex in pending.items()},
-                )
-                raise RuntimeError(
-                    f"Circular dependency in tool execution. Remaining: {remaining}"
-                )
-
-            # Execute ready tools in parallel
-            logger.info(
-                "executing-tools-parallel",
-                count=len(ready),
-                tools=[ex.tool_name for ex in ready],
-            )
+        async for execution in self.iter_completed(executions, context):
+            if execution.result is not None:
+                results[execution.tool_name] = execution.result
+        return results
 
-            tasks = {
-                ex.tool_name: self._execute_with_retry(ex, context) for ex in ready
-            }
+    async def iter_completed(
+        self,
+        executions: list[ToolExecution],
+        context: ToolContext,
+    ) -> AsyncIterator[ToolExecution]:
+        """
+        Run tools respecting dependencies and yield each execution as soon as it
+        finishes, with either ``result`` or ``error`` set.
+        A dependent tool starts once every tool it depends on has finished,
+        without waiting for unrelated slower tools.
+        """
+        waiting = list(executions)
+        running: dict[asyncio.Task, ToolExecution] = {}
 
-            # Wait for completion
-            completed_tasks = await asyncio.gather(
-                *tasks.values(), return_exceptions=True
+        def unfinished(tool_name: str) -> bool:
+            return any(ex.tool_name == tool_name for ex in waiting) or any(
+                ex.tool_name == tool_name for ex in running.values()
             )
 
-            # Process results
-            for tool_name, result in zip(tasks.keys(), completed_tasks):
-                execution = pending[tool_name]
-
-                if isinstance(result, Exception):
+        try:
+            while waiting or running:
+                ready = [
+                    ex
+                    for ex in waiting
+                    if not any(unfinished(dep) for dep in ex.depends_on)
+                ]
+                if ready:
+                    logger.info(
+                        "executing-tools-parallel",
+                        count=len(ready),
+                        tools=[ex.tool_name for ex in ready],
+                    )
+                    for ex in ready:
+                        waiting.remove(ex)
+                        task = asyncio.create_task(
+                            self._execute_with_retry(ex, context)
+                        )
+                        running[task] = ex
+                elif not running:
+                    remaining = [ex.tool_name for ex in waiting]
                     logger.error(
-                        "tool-execution-failed",
-                        tool=tool_name,
-                        error=str(result),
-                        error_type=type(result).__name__,
+                        "circular-dependency-detected",
+                        remaining_tools=remaining,
+                        dependencies={ex.tool_name: ex.depends_on for ex in waiting},
                     )
-                    execution.error = result
-                    # Don't add to results, but mark as completed to unblock dependents
-                else:
-                    results[tool_name] = result
-                    execution.result = result
-                    logger.info(
-                        "tool-execution-success",
-                        tool=tool_name,
-                        duration_ms=round(execution.duration_ms, 2),
-                        has_chunks=len(result.used_chunks) > 0,
+                    raise RuntimeError(
+                        f"Circular dependency in tool execution. Remaining: {remaining}"
                     )
 
-                completed.add(tool_name)
-                del pending[tool_name]
-
-        return results
+                done, _ = await asyncio.wait(
+                    running, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    execution = running.pop(task)
+                    exc = task.exception()
+                    if exc is not None:
+                        logger.error(
+                            "tool-execution-failed",
+                            tool=execution.tool_name,
+                            error=str(exc),
+                            error_type=type(exc).__name__,
+                        )
+                        # Failed tools still count as finished to unblock dependents
+                        execution.error = exc
+                    else:
+                        execution.result = task.result()
+                        logger.info(
+                            "tool-execution-success",
+                            tool=execution.tool_name,
+                            duration_ms=round(execution.duration_ms, 2),
+                            has_chunks=len(execution.result.used_chunks) > 0,
+                        )
+                    yield execution
+        finally:
+            for task in running:
+                task.cancel()
+            # tools share the request's AsyncSession; none may still be using it
+            # once the caller moves on (e.g. to the sequential fallback)
+            await asyncio.gather(*running, return_exceptions=True)
 
     async def _execute_with_retry(
         self,
@@ -216,6 +232,7 @@ class ParallelToolExecutor:
                     tool_name=tool_name,
                     arguments=args,
                     depends_on=depends_on,
+                    call_id=call.get("id"),
                 )
             )
             tool_names.append(tool_name)
@@ -6,7 +6,7 @@ import mimetypes
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import PurePosixPath
-from typing import Any
+from typing import Any, BinaryIO
 from urllib.parse import quote, urlparse
 from uuid import uuid4
 
@@ -90,6 +90,25 @@ class MinioStorageClient:
         user_id: int | None,
         content_type: str | None = None,
         metadata: dict[str, Any] | None = None,
+    ) -> str:
+        return await self.upload_stream(
+            stream=io.BytesIO(data),
+            length=len(data),
+            filename=filename,
+            user_id=user_id,
+            content_type=content_type,
+            metadata=metadata,
+        )
+
+    async def upload_stream(
+        self,
+        *,
+        stream: BinaryIO,
+        length: int,
+        filename: str,
+        user_id: int | None,
+        content_type: str | None = None,
+        metadata: dict[str, Any] | None = None,
     ) -> str:
         await self._ensure_bucket()
 
@@ -108,8 +127,8 @@ class MinioStorageClient:
             self._client.put_object,
             self._config.bucket_name,
             object_name,
-            io.BytesIO(data),
-            len(data),
+            stream,
+            length,
             content_type=mtype,
             metadata={k: str(v) for k, v in meta.items()},
         )
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import io
 import mimetypes
+from typing import BinaryIO
 
 import structlog
 
@@ -14,15 +16,23 @@ logger = structlog.get_logger(__name__)
 storage_client = MinioStorageClient.from_settings()
 
 
-async def upload_to_s3(file: bytes, filename: str, user: User) -> str:
-    if not file:
+async def upload_to_s3(
+    file: bytes | BinaryIO, filename: str, user: User, length: int | None = None
+) -> str:
+    if isinstance(file, bytes):
+        stream, length = io.BytesIO(file), len(file)
+    else:
+        stream = file
+        stream.seek(0)
+    if not length:
         raise ValueError("File content is empty")
 
     content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
 
     try:
-        return await storage_client.upload_bytes(
-            data=file,
+        return await storage_client.upload_stream(
+            stream=stream,
+            length=length,
             filename=filename,
             user_id=user.user_id,
             content_type=content_type,
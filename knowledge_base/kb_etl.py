@@ -20,6 +20,7 @@ from pathlib import Path
 from types import SimpleNamespace
 from typing import Awaitable, Callable, Iterator, TypeVar
 
+import numpy as np
 
 # Ensure backend modules are importable (DocumentVectorManager helpers, config, etc.)
 REPO_ROOT = Path(__file__).resolve().parents[1]
@@ -269,7 +270,7 @@ async def embed_and_upsert(
     if dry_run:
         return len(chunk_records), chunk_id_counter
 
-    async def _embed() -> list[list[float]]:
+    async def _embed() -> np.ndarray:
         return await embed_client.embed_texts(
             [record.chunk.chunk_content for record in chunk_records]
         )
@@ -327,6 +328,15 @@ async def run_pipeline(args: argparse.Namespace) -> None:
         url=settings.QDRANT_URL,
         collection_name=args.collection_name,
         batch_size=settings.QDRANT_BATCH_SIZE,
+        prefer_grpc=settings.QDRANT_PREFER_GRPC,
+        grpc_port=settings.QDRANT_GRPC_PORT,
+        timeout=settings.QDRANT_TIMEOUT_SECONDS,
+        scalar_quantization=settings.QDRANT_SCALAR_QUANTIZATION,
+        quantization_quantile=settings.QDRANT_QUANTIZATION_QUANTILE,
+        vectors_on_disk=settings.QDRANT_VECTORS_ON_DISK,
+        float16_vectors=settings.QDRANT_FLOAT16_VECTORS,
+        default_segment_number=settings.QDRANT_DEFAULT_SEGMENT_NUMBER,
+        store_chunk_content=True,
     )
     if not vector_store.is_enabled and not args.dry_run:
         raise RuntimeError("Qdrant is not configured (check QDRANT_URL).")